@@ -44,6 +44,7 @@ if "bpy" in locals():
 import bpy
 from . import registration
 from . import preferences
+from .utils import export_bgo
 from nodeitems_utils import NodeItem, register_node_categories, unregister_node_categories
 from nodeitems_builtins import ShaderNodeCategory
 import threading
@@ -66,6 +67,7 @@ def register():
     # Register Wrapper Node
     newcatlist = [ShaderNodeCategory("SH_NEW_CUSTOM", "Wreckfest", items=[NodeItem("WreckfestWrapperNode"), ]), ]
     register_node_categories("CUSTOM_NODES", newcatlist)
+    export_bgo.register_handlers()
     addons.register()
 
 
@@ -75,6 +77,7 @@ def unregister():
     registration.unregister_menus()
 
     unregister_node_categories("CUSTOM_NODES")
+    export_bgo.unregister_handlers()
 
     del bpy.types.WindowManager.WFTBPanel
 
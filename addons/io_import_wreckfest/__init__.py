@@ -25,8 +25,11 @@ class config():
     # Bmap Cache Configuration
     c_resolution = 1500 # Cache image maximum resolution, 1024, 2048 etc.
     c_extension = 'cmap' # Cache image extension, 'cmap' or 'webp'
+    c_workers = 4 # Background conversion threads
+    c_preview = 256 # Preview image resolution, shown until full resolution image is ready
 
 import bpy
+from bpy.app.handlers import persistent
 import os
 import binascii
 import struct
@@ -39,9 +42,15 @@ import hashlib
 import time
 import math
 import tempfile
+import shutil
+import threading
+import concurrent.futures
+import queue
 import addon_utils
 import numpy as np
 from .bagparse import BagParse
+from . import imagefile
+from . import bmapcache
 
 try:
     from . import uv
@@ -112,6 +121,8 @@ class ImportScneData(bpy.types.Operator, ImportHelper):
         start = time.time()
         folder = (os.path.dirname(self.filepath))
         is_vhcl, is_vhcm = None, None
+        ImageIndex.build()
+        MaterialTemplates.reset()
         for file in self.files:
             if file.name == 'body.vhcl': is_vhcl = True
             if file.name == 'body_meta.vhcm': is_vhcm = True
@@ -127,6 +138,8 @@ class ImportScneData(bpy.types.Operator, ImportHelper):
                 show_messagebox(message="body_meta.vhcm imported", title = "Autoimporter", icon = 'INFO')
 
         print('\nFinished in', round(time.time()-start,2), 's')
+        if BmapQueue.pending():
+            print(BmapQueue.pending(), 'textures converting in background')
         collapse_collections(context)
         return {'FINISHED'}
 
@@ -194,6 +207,7 @@ class ImportBmapData(bpy.types.Operator, ImportHelper):
 
     def execute(self, context):
         folder = (os.path.dirname(self.filepath))
+        ImageIndex.build()
         for i, file in enumerate(self.files):
             if file.name != '':
                 path_and_file = (os.path.join(folder, file.name))
@@ -331,8 +345,15 @@ def register():
         bpy.utils.register_class(WM_FH_bmap)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
     bpy.utils.register_class(io_import_wreckfest)
+    bpy.app.handlers.save_pre.append(bmap_queue_save_pre)
+    bpy.app.handlers.save_post.append(bmap_queue_save_post)
 
 def unregister():
+    if bmap_queue_save_pre in bpy.app.handlers.save_pre:
+        bpy.app.handlers.save_pre.remove(bmap_queue_save_pre)
+    if bmap_queue_save_post in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.remove(bmap_queue_save_post)
+    BmapQueue.shutdown()
     bpy.utils.unregister_class(ImportScneData)
     bpy.utils.unregister_class(ImportScneDataPh)
     bpy.utils.unregister_class(ImportBmapData)
@@ -354,25 +375,55 @@ if __name__ == "__main__":
 # SCNE import
 
 class NodeGroupShader():
-    '''Tools for working with node group shaders'''
+    '''Tools for working with node group shaders. Loaded once per session, reloaded if node groups change'''
     nodegroups = [] # All node groups with '#' in name
     shadernames = {} # Dictionary: [Wreckest Shader Tag : Node Group Name]
+    found = {} # Dictionary: [(Material name, simpleBlendmat) : Node Group Name]
+    requested = set() # Tags already requested from Toolbox shader library
+    TAG = r'#[^\s#]+' # Whole #tag in material name
+    signature = None # Node group count and names when loaded
     loaded = False
 
     @classmethod
     def reset(self):
         self.nodegroups = []
         self.shadernames = {}
+        self.found = {}
+        self.requested = set()
+        self.signature = None
         self.loaded = False
 
+    @staticmethod
+    def current_signature():
+        '''Changes when node groups are added, removed or renamed'''
+        return (len(bpy.data.node_groups), hash(tuple(bpy.data.node_groups.keys())))
+
     @classmethod
     def load(self):
-        '''Load node group shaders from Toolbox'''
+        '''Load node group shaders from Toolbox. Default shaders only, others are appended when materials need them'''
+        if self.loaded and self.signature == self.current_signature():
+            return # Already loaded in this session
+        self.reset()
+        if not self.append(['#pbr', '#blend']):
+            popup('Toolbox shaders not found. Imported with Principled BSDF')
+        self.scan()
+
+    @classmethod
+    def append(self, tags):
+        '''Append node groups with #tags from Toolbox shader library'''
+        self.requested.update(tags)
         try:
-            bpy.ops.wf_shaders.append_wf_shaders()
+            bpy.ops.wf_shaders.append_wf_shaders(groups=','.join(tags))
         except:
-            popup('Toolbox shaders not found. Imported with Principled BSDF')
-        # Update available shaders list
+            return False
+        return True
+
+    @classmethod
+    def scan(self):
+        '''Update available shaders list'''
+        self.nodegroups = []
+        self.shadernames = {}
+        self.found = {}
         for groupname in bpy.data.node_groups.keys():
             if groupname.strip().startswith('#'):
                 shadername = groupname.strip().split(' ', maxsplit=1)[0]
@@ -385,27 +436,37 @@ class NodeGroupShader():
             self.shadernames.update({'#pbr': '#pbr Default'})
         if '#blend' in self.nodegroups:
             self.shadernames.update({'#blend': '#blend'})
+        self.signature = self.current_signature()
 
     @classmethod
     def find(self, matName, simpleBlendmat=False):
         '''Find node group for material'''
-        # Detect special #blend shader
-        if '#blend' in matName and not simpleBlendmat and '#blend Advanced' in self.nodegroups:
-            return bpy.data.node_groups['#blend Advanced']
-        # Detect by material #tag
-        shader = self.find_shader_for_mat(matName)
-        if(shader):
-            return shader
-        # Default to '#pbr Default' shader
-        return bpy.data.node_groups[self.shadernames['#pbr']]
+        groupname = self.found.get((matName, simpleBlendmat))
+        if groupname is None:
+            # Append shaders for tags not seen before
+            missing = [tag for tag in re.findall(self.TAG, matName) if tag not in self.shadernames and tag not in self.requested]
+            if missing and self.append(missing) and self.signature != self.current_signature():
+                self.scan()
+            # Detect special #blend shader
+            if '#blend' in matName and not simpleBlendmat and '#blend Advanced' in self.nodegroups:
+                groupname = '#blend Advanced'
+            else:
+                # Detect by material #tag, default to '#pbr Default' shader
+                groupname = self.find_shader_for_mat(matName) or self.shadernames['#pbr']
+            self.found[(matName, simpleBlendmat)] = groupname
+        return bpy.data.node_groups[groupname]
 
     @classmethod
     def find_shader_for_mat(self, matName):
-        '''Find node group with tag matching to material'''
-        for shader_name in self.shadernames:
+        '''Find name of node group with tag matching to material'''
+        for tag in re.findall(self.TAG, matName): # Whole #tags in material name
+            if tag in self.shadernames:
+                return self.shadernames[tag]
+        for shader_name in self.shadernames: # Tags joined to other text, e.g. '#pbr_tiled'
             if shader_name in matName:
-                return bpy.data.node_groups[self.shadernames[shader_name]]
-        return False
+                return self.shadernames[shader_name]
+        return None
+
         
 def show_messagebox(message = "", title = "Message Box", icon = 'INFO'):
     def draw(self, context):
@@ -599,54 +660,433 @@ def fix_lod(string):
     if __name__+'.uv' in sys.modules: return string
     return re.sub('(?i)[_#](lod)[0-9]', '', string) 
 
-def save_image(image, filename, format, quality=90):
-    '''Save image from bpy.data.images to disk'''
-    print('Saving   : ',filename)
-    os.makedirs(os.path.dirname(filename), exist_ok=True) 
+def image_pixels(image):
+    '''Get pixels of bpy.data.images image as uint8 RGBA array'''
+    width, height = image.size
+    flat = np.empty(width*height*4, dtype=np.float32)
+    image.pixels.foreach_get(flat) # Fastest way to read pixels
+    return imagefile.from_blender_pixels(flat, width, height)
 
-    s = bpy.context.scene.render.image_settings
-    backup = s.file_format, s.color_mode, s.quality # Backup
-    s.file_format = format # Change format temporarily for saving
-    s.color_mode = 'RGBA'
-    s.quality = quality
-    image.save_render(filename)
-    s.file_format, s.color_mode, s.quality = backup # Restore
+def breckfest_unpack(breckfest_location, bmapFile, tempFolder):
+    '''Unpack .bmap file into .png with Breckfest, return path of .png. Does not use bpy, safe in background thread'''
+    exe_str = '"'+breckfest_location+'" "'+bmapFile+'"'
+    print(exe_str,'\n')
+    try:
+        subprocess.run(exe_str, shell=False, cwd=tempFolder, timeout=60) # run = wait for Breckfest to finish, cwd = folder of unpack 
+    except subprocess.TimeoutExpired:
+        print("Error: Breckfest took longer than 60 seconds.")
+
+    noExtension = os.path.join(tempFolder, bmapFile.split('\\')[-1][:-5])
+    for ext in ['.dxt1.png', '.dxt5.png', '.ati2.png']: # Check if Breckfest unpacked file found.
+        if os.path.isfile(noExtension + ext):
+            return noExtension + ext
+    print("Error: Breckfest generated file not found.")
+
+def load_pixels(foundPng, resolution=None):
+    '''Load .png unpacked by Breckfest and return pixels. Removes the .png
+    Image is scaled to fit resolution before reading, full size float pixels are never copied'''
+    image = bpy.data.images.load(foundPng) # check_existing=True
+    try:
+        image.colorspace_settings.name = 'Non-Color' # Keeps colors intact during save.
+        x, y = image.size
+        if resolution and x*y > resolution*resolution and not __name__+'.uv' in sys.modules:
+            while x*y > resolution*resolution: # Halve like mip levels
+                x, y = max(x//2, 1), max(y//2, 1)
+            image.scale(x, y)
+        pixels = image_pixels(image)
+    finally:
+        os.remove(foundPng) # delete png file made by Breckfest
+        bpy.data.images.remove(image) # remove file from Blender memory
+    return pixels
+
+def scale_pixels(pixels, resolution):
+    '''Resize image by halving until it fits in resolution'''
+    if __name__+'.uv' in sys.modules:
+        return pixels
+    return imagefile.downscale(pixels, resolution)
+
+def bmapcache_folder():
+    '''Wreckfest\\tools\\BmapCache folder. None if Wreckfest path is not set'''
+    try:
+        wf_path = bpy.context.preferences.addons['wreckfest_toolbox'].preferences.wf_path
+    except:
+        return None
+    if not os.path.isdir(os.path.join(wf_path, 'tools')):
+        return None
+    return os.path.join(wf_path, 'tools', 'BmapCache')
 
 def convert_bmap_file_to_image(bmapFile, tgaPath, quality=90, resolution=256, file_format='TARGA'):   
     '''Open .bmap file on disk and save as .tga or .webp'''
     # File_formats: https://docs.blender.org/api/current/bpy_types_enum_items/image_type_items.html#rna-enum-image-type-items
     breckfest_location = breckfest_locate()
     tempFolder = tempfile.gettempdir() # Windows: C:\users\user\AppData\Local\Temp 
-    exe_str = '"'+breckfest_location+'" "'+bmapFile+'"'
-    print(exe_str,'\n')
     if os.path.isfile(breckfest_location) and not os.path.isfile(tgaPath):
+        foundPng = breckfest_unpack(breckfest_location, bmapFile, tempFolder)
+        if foundPng is None: return # File not found, exiting
+        pixels = scale_pixels(load_pixels(foundPng, resolution), resolution)
+        print('Saving   : ',tgaPath)
+        if not os.path.isfile(tgaPath): imagefile.save(pixels, tgaPath, file_format, quality)
+
+class ImageIndex():
+    '''Image datablocks by name and by file path. Built once per import, updated when importer adds images'''
+    names = {} # Dictionary: [Image name : Image]
+    paths = {} # Dictionary: [Normalized absolute path : {Image name : Image}]
+
+    @staticmethod
+    def key(filepath):
+        '''Normalized absolute path used to match images'''
+        return os.path.normcase(os.path.abspath(bpy.path.abspath(filepath)))
+
+    @staticmethod
+    def alive(image, name):
+        '''Test that image has not been removed or renamed since indexing'''
+        try:
+            return image.name == name
+        except ReferenceError:
+            return False
+
+    @classmethod
+    def build(self):
+        self.names = {}
+        self.paths = {}
+        for image in bpy.data.images:
+            self.add(image)
+
+    @classmethod
+    def add(self, image):
+        self.names[image.name] = image
+        if image.source == 'FILE' and image.filepath:
+            self.paths.setdefault(self.key(image.filepath), {})[image.name] = image
+
+    @classmethod
+    def discard(self, image):
+        '''Forget image before removing it from Blender'''
+        self.names.pop(image.name, None)
+        for images in self.paths.values():
+            images.pop(image.name, None)
+
+    @classmethod
+    def get(self, name):
+        '''Image by name, None if not found'''
+        image = self.names.get(name)
+        if image is not None and self.alive(image, name):
+            return image
+        image = bpy.data.images.get(name) # Not indexed or index outdated
+        if image is not None:
+            self.add(image)
+        return image
+
+    @classmethod
+    def find(self, key):
+        '''Images referring to normalized path key'''
+        images = self.paths.get(key, {})
+        for name, image in list(images.items()):
+            if not self.alive(image, name): # Removed or renamed
+                del images[name]
+        return list(images.values())
+
+class MaterialTemplates():
+    '''Materials built during import by node layout. Later materials with same layout are copied instead of rebuilt'''
+    names = {} # Dictionary: [Layout signature : Material name]
+
+    @classmethod
+    def reset(self):
+        self.names = {}
+
+    @classmethod
+    def get(self, signature):
+        name = self.names.get(signature)
+        if name is not None:
+            return bpy.data.materials.get(name)
+
+    @classmethod
+    def add(self, signature, mat):
+        self.names[signature] = mat.name
+
+class BmapQueue():
+    '''Background .bmap conversion. Images are reloaded once ready, large textures show low resolution preview first.
+    Converted images are stored by .bmap content hash, identical textures are converted once and share one image datablock'''
+    executor = None
+    jobs = {} # Dictionary: [Output path key : Job settings]
+    done = queue.Queue() # Events from worker threads: (stage, key, result)
+    previews = {} # Dictionary: [Output path key : List of (image name, original filepath, preview filepath)]
+    manifest = None
+    lock = threading.Lock() # Guards converting
+    converting = set() # Stored image paths being converted by some job
+    waiting = {} # Dictionary: [Stored image path : List of output path keys waiting for it]
+    hashKeys = {} # Dictionary: [Content hash : Output path key of first image with that content]
+
+    key = staticmethod(ImageIndex.key) # Normalized absolute path used to match jobs and images
+
+    @classmethod
+    def pending(self):
+        return len(self.jobs)
+
+    @classmethod
+    def submit(self, bmapFile, tgaPath, quality=90, resolution=256, file_format='TARGA'):
+        '''Queue conversion of .bmap file. Returns immediately'''
+        key = self.key(tgaPath)
+        if key in self.jobs or os.path.isfile(tgaPath):
+            return
+        breckfest_location = breckfest_locate() # Preferences can only be read in main thread
+        if not os.path.isfile(breckfest_location):
+            return
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=config.c_workers)
+
+        job = {
+            'bmap': bmapFile,
+            'path': tgaPath,
+            'relpath': None, # data\.. path, key in cache manifest
+            'manifest': None,
+            'hash': None, # Content hash of .bmap, set by worker
+            'store': None, # Path of full tier in content hash store, set by worker
+            'link': False, # Hard link stored image to path instead of copying
+            'owner': False, # This job converts the stored image, others with same content wait
+            'preview': None, # Path of preview tier to be saved
+            'previewPath': None, # Path of saved preview tier
+            'quality': quality,
+            'resolution': resolution,
+            'format': file_format,
+            'temp': tempfile.mkdtemp(prefix='bmap_'), # Own folder for each job, files with same name don't collide
+        }
+        folder = bmapcache_folder()
+        bmapPath = bmapFile.replace('/','\\')
+        if folder and '\\data\\' in bmapPath:
+            if self.manifest is None or self.manifest.folder != folder:
+                self.manifest = bmapcache.CacheManifest(folder)
+            job['relpath'] = "data\\" + re.split(r'\\data\\', bmapPath)[-1]
+            job['manifest'] = self.manifest
+            # Files inside BmapCache can be links, mod textures get own copy so editing them doesn't touch cache
+            job['link'] = key.startswith(os.path.normcase(os.path.abspath(folder)))
+
+        self.jobs[key] = job
+        self.executor.submit(self.unpack_job, key, breckfest_location, job)
+        if not bpy.app.timers.is_registered(bmap_queue_update):
+            bpy.app.timers.register(bmap_queue_update, first_interval=0.2)
+
+    @classmethod
+    def unpack_job(self, key, breckfest_location, job):
+        '''Worker thread: Find converted image by content hash, otherwise unpack with Breckfest'''
+        try:
+            manifest = job['manifest']
+            if manifest is not None:
+                job['hash'] = manifest.content_hash(job['relpath'], job['bmap'])
+                extension = config.c_extension if job['format'] == 'WEBP' else 'tga'
+                job['store'] = manifest.store_path(job['hash'], str(job['resolution']), extension)
+                if job['resolution'] > config.c_preview:
+                    previewStore = manifest.store_path(job['hash'], 'preview', config.c_extension)
+                    if os.path.isfile(previewStore): # Preview made earlier, show it right away
+                        job['previewPath'] = previewStore
+                        self.done.put(('preview', key, None))
+                    else:
+                        job['preview'] = previewStore
+                if os.path.isfile(job['store']): # Same content converted earlier
+                    bmapcache.place(job['store'], job['path'], job['link'])
+                    self.done.put(('full', key, None))
+                    return
+                with self.lock:
+                    if job['store'] in self.converting: # Same content being converted by another job
+                        self.done.put(('duplicate', key, job['store']))
+                        return
+                    self.converting.add(job['store'])
+                    job['owner'] = True
+            foundPng = breckfest_unpack(breckfest_location, job['bmap'], job['temp'])
+        except Exception as e:
+            print("Error: Breckfest failed:", e)
+            foundPng = None
+        self.done.put(('unpacked', key, foundPng))
+
+    @classmethod
+    def encode_job(self, key, pixels, job):
+        '''Worker thread: Scale and save preview tier first, then full resolution'''
         try:
-            subprocess.run(exe_str, shell=False, cwd=tempFolder, timeout=60) # run = wait for Breckfest to finish, cwd = folder of unpack 
-        except subprocess.TimeoutExpired:
-            print("Error: Breckfest took longer than 60 seconds.")
-
-        noExtension = tempFolder +'\\'+ bmapFile.split('\\')[-1][:-5] 
-        for ext in ['.dxt1.png', '.dxt5.png', '.ati2.png']: # Check if Breckfest unpacked file found.
-            if os.path.isfile(noExtension + ext):
-                foundPng = noExtension + ext
-                image = bpy.data.images.load(foundPng) # check_existing=True
-                image.colorspace_settings.name = 'Non-Color' # Keeps colors intact during save.
+            pixels = scale_pixels(pixels, job['resolution'])
+            if job['preview'] and pixels.shape[0]*pixels.shape[1] > config.c_preview*config.c_preview:
+                preview = imagefile.downscale(pixels, config.c_preview)
+                imagefile.save(preview, job['preview'], 'WEBP', job['quality'])
+                self.done.put(('preview', key, preview.shape))
+            if job['store']:
+                imagefile.save(pixels, job['store'], job['format'], job['quality'])
+                bmapcache.place(job['store'], job['path'], job['link'])
+            else:
+                imagefile.save(pixels, job['path'], job['format'], job['quality'])
+            self.done.put(('full', key, pixels.shape))
+        except Exception as e:
+            print("Error: Saving texture failed:", e)
+            self.done.put(('failed', key, None))
+
+    @classmethod
+    def update(self):
+        '''Handle events from worker threads. Runs in main thread'''
+        decoded = 0
+        while decoded < 4: # Limit decoding per update to keep UI responsive
+            try:
+                stage, key, result = self.done.get_nowait()
+            except queue.Empty:
                 break
-        else: # File not found, exiting
-            print("Error: Breckfest generated file not found.")
-            return 
+            job = self.jobs.get(key)
+            if job is None: # Cancelled
+                continue
+            if stage == 'unpacked':
+                try:
+                    if result:
+                        self.executor.submit(self.encode_job, key, load_pixels(result, job['resolution']), job)
+                        decoded += 1
+                    else:
+                        self.fail(key)
+                except Exception as e: # Corrupt .png, keep other jobs going
+                    print("Error: Loading texture failed:", e)
+                    self.fail(key)
+                finally:
+                    shutil.rmtree(job['temp'], ignore_errors=True)
+            elif stage == 'duplicate':
+                shutil.rmtree(job['temp'], ignore_errors=True)
+                with self.lock:
+                    busy = result in self.converting
+                if busy:
+                    self.waiting.setdefault(result, []).append(key)
+                elif os.path.isfile(result): # Other job finished before this event got handled
+                    try:
+                        bmapcache.place(result, job['path'], job['link'])
+                    except OSError as e:
+                        print("Error: Placing texture failed:", e)
+                        self.fail(key)
+                        continue
+                    self.finish(key, None)
+                else:
+                    self.fail(key)
+            elif stage == 'preview':
+                if result is not None:
+                    job['previewPath'] = job['preview']
+                    self.manifest.set(job['relpath'], 'preview', job['preview'], result[1::-1])
+                self.show_preview(key, job['previewPath'])
+            elif stage == 'full':
+                self.finish(key, result)
+            else: # Failed
+                self.fail(key)
+
+        if self.manifest is not None:
+            self.manifest.save()
+        if self.jobs or not self.done.empty():
+            return 0.2 # Seconds to next update
+        return None # Unregister timer
 
-        # Resize image
-        x, y = image.size
-        while(x*y > resolution*resolution):
-            x = x/2
-            y = y/2
-        if not __name__+'.uv' in sys.modules:
-            image.scale(int(x),int(y))
+    @classmethod
+    def release(self, job):
+        '''Stop tracking stored image of job. Returns keys of jobs that were waiting for it'''
+        with self.lock:
+            self.converting.discard(job['store'])
+        return self.waiting.pop(job['store'], [])
 
-        if not os.path.isfile(tgaPath): save_image(image, tgaPath, file_format, quality)
-        os.remove(foundPng) # delete png file made by Breckfest
-        bpy.data.images.remove(image) # remove file from Blender memory
+    @classmethod
+    def finish(self, key, shape):
+        '''Converted image is in place. Update manifest, reload images and handle jobs waiting for same content'''
+        job = self.jobs.pop(key)
+        if job['relpath'] and shape is not None:
+            self.manifest.set(job['relpath'], 'full', job['path'], shape[1::-1])
+        self.show_full(key)
+        if job['hash']:
+            self.share_image(key, job['hash'])
+        for waitKey in (self.release(job) if job['owner'] else []):
+            waitJob = self.jobs.get(waitKey)
+            if waitJob is None:
+                continue
+            try:
+                bmapcache.place(job['store'], waitJob['path'], waitJob['link'])
+            except OSError as e:
+                print("Error: Placing texture failed:", e)
+                self.fail(waitKey)
+                continue
+            self.finish(waitKey, None)
+
+    @classmethod
+    def fail(self, key):
+        job = self.jobs.pop(key)
+        for image in self.restore_preview(key): # Don't leave materials on preview tier
+            image.reload()
+        if job['owner']:
+            for waitKey in self.release(job):
+                if waitKey in self.jobs:
+                    self.fail(waitKey)
+
+    @classmethod
+    def share_image(self, key, contentHash):
+        '''Remap users of images with same content to one datablock'''
+        firstKey = self.hashKeys.setdefault(contentHash, key)
+        if firstKey == key:
+            return
+        shared = ImageIndex.find(firstKey)
+        if not shared: # First image was removed, this one takes its place
+            self.hashKeys[contentHash] = key
+            return
+        for image in ImageIndex.find(key):
+            image.user_remap(shared[0])
+            ImageIndex.discard(image)
+            bpy.data.images.remove(image)
+
+    @classmethod
+    def show_preview(self, key, previewPath):
+        '''Point images waiting for conversion to preview tier'''
+        swapped = self.previews.setdefault(key, [])
+        for image in ImageIndex.find(key): # Index keeps original path while preview is shown
+            swapped.append((image.name, image.filepath, previewPath))
+            image.filepath_raw = previewPath
+            image.reload()
+
+    @classmethod
+    def restore_preview(self, key):
+        '''Point images shown as preview back to their original path. Returns them, reload is left to caller'''
+        restored = []
+        for name, filepath, previewPath in self.previews.pop(key, []):
+            image = ImageIndex.get(name)
+            if image is not None:
+                image.filepath_raw = filepath # No reload yet
+                ImageIndex.add(image)
+                restored.append(image)
+        return restored
+
+    @classmethod
+    def swap_previews(self, original):
+        '''Switch images shown as preview between original and preview path without reloading.
+        Original paths are set for saving, so cache folder previews never end up in .blend'''
+        for swapped in self.previews.values():
+            for name, filepath, previewPath in swapped:
+                image = ImageIndex.get(name)
+                if image is not None:
+                    image.filepath_raw = filepath if original else previewPath
+
+    @classmethod
+    def show_full(self, key):
+        '''Upgrade preview images to full resolution'''
+        self.restore_preview(key)
+        for image in ImageIndex.find(key):
+            image.reload()
+
+    @classmethod
+    def shutdown(self):
+        if bpy.app.timers.is_registered(bmap_queue_update):
+            bpy.app.timers.unregister(bmap_queue_update)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.executor = None
+        self.jobs = {}
+        self.previews = {}
+        self.converting = set()
+        self.waiting = {}
+        self.hashKeys = {}
+
+def bmap_queue_update():
+    '''Timer callback for BmapQueue'''
+    return BmapQueue.update()
+
+@persistent
+def bmap_queue_save_pre(*args):
+    BmapQueue.swap_previews(original=True)
+
+@persistent
+def bmap_queue_save_post(*args):
+    BmapQueue.swap_previews(original=False)
 
 def image_refer(fileName, fullPath):
     '''Image loading for images that may not exist yet'''
@@ -654,6 +1094,7 @@ def image_refer(fileName, fullPath):
     image.source = 'FILE' # overwrite with external image
     image.filepath = fullPath
     image.generated_type ='UV_GRID'
+    ImageIndex.add(image)
     return image
 
 def add_mapping_node(scale, linkOutputTo, material, YLocation):
@@ -740,96 +1181,125 @@ def add_wf_material(txtrList,matName,filepath,spec,gloss,imp_tga,textureUV,textu
         dataFolder = importFolder # nonsense bugfix
         relativeTo = importFolder
 
-    if (matName in bpy.data.materials):  mat = bpy.data.materials.get(matName)
-    else: 
-        mat = bpy.data.materials.new(matName)
+    isBlend = "#blend" in matName.lower()
+    clip = False
+    if(len(txtrList)>0 and '#car_body' not in matName): # Set viewport transparency
+        tgaPath = txtrList[0][1].lower()
+        if(txtrList[0][0] == 1 and ('_c1.' in tgaPath or '_c5.' in tgaPath)): # 1 = diffuse color
+            clip = True
+    shaderGroup = NodeGroupShader.find(matName, simpleBlendmat) if NodeGroupShader.loaded else None
+
+    # Find image for each texture slot
+    slots = [] # List of (key, tgaPath, image)
+    for tx in txtrList:
+        key = tx[0]
+        if(not simpleBlendmat or (key in blendMatTranslate.keys())): # Normal material, or 4 chosen Blendmap textures ok (ignoring auto generated materials)
+            if(simpleBlendmat): key = blendMatTranslate[key] # Translate Blendmat keys 
+            bmapPath = tx[1].replace('/','\\') # 'data\art\objects...
+            tgaPath = bmapPath.replace('.bmap', '.tga') # 'data\art\objects...
+            fileName = tgaPath.split('\\')[-1]
+
+            image = ImageIndex.get(fileName)
+            if (image is None): # Make new image, otherwise use existing image with same name
+
+                # Save tga files on disk
+                if(imp_tga and '\\data\\' in blendFolder and '\\mods\\' in blendFolder):
+                    if(bmapPath.split('_')[-1].lower() in ['c.bmap', 'c1.bmap', 'c5.bmap']): #Allowed extensions
+                        BmapQueue.submit( bmapFile=dataFolderImport+bmapPath, tgaPath=dataFolderBlend+tgaPath ) # Convert in background
+
+                # New image datablock with relative reference to file
+                image = image_refer(fileName, fullPath=bpy.path.relpath(dataFolder+tgaPath,start=relativeTo)) 
+            slots.append((key, tgaPath, image))
+
+    # Materials with same node layout differ only by images, scale and specular values
+    hasMapping = lambda key: isBlend and key in textureScale and (textureScale[key][0]!=1 or textureScale[key][1]!=1)
+    signature = (shaderGroup.name if shaderGroup else None, simpleBlendmat, isBlend, clip,
+        tuple((key, ('_c1.' in tgaPath or '_c5.' in tgaPath), textureUV.get(key), hasMapping(key)) for key, tgaPath, image in slots))
+    template = MaterialTemplates.get(signature)
+    if template is not None:
+        mat = template.copy()
+        mat.name = matName
         mat.specular_intensity = spec
         mat.roughness = gloss
-        mat.use_nodes = True
-        if(len(txtrList)>0 and '#car_body' not in matName): # Set viewport transparency
-            tgaPath = txtrList[0][1].lower()
-            if(txtrList[0][0] == 1 and ('_c1.' in tgaPath or '_c5.' in tgaPath)): # 1 = diffuse color
-                mat.blend_method = 'CLIP'
-
-        # Material output node
-        outNode = mat.node_tree.nodes["Material Output"]
-        outNode.location = (400,300)
-
-        if(NodeGroupShader.loaded):
-            wftbNode = mat.node_tree.nodes.new('ShaderNodeGroup')
-            wftbNode.node_tree = NodeGroupShader.find(matName, simpleBlendmat)
-            wftbNode.location = (100,300)
-            wftbNode.width = 240
-            mat.node_tree.nodes.remove(mat.node_tree.nodes["Principled BSDF"]) # Delete default node
-            mat.node_tree.links.new(wftbNode.outputs[0], outNode.inputs[0])
-        else:   
-            bsdfNode = mat.node_tree.nodes["Principled BSDF"]
-            bsdfNode.location = (100,300)
-
-        # #blend uv nodes
-        if("#blend" in matName.lower()):
-             uvNode1 = mat.node_tree.nodes.new('ShaderNodeUVMap')
-             uvNode1.uv_map = "UVMap"
-             uvNode1.location = (-650,300)
-             uvNode2 = mat.node_tree.nodes.new('ShaderNodeUVMap')
-             uvNode2.uv_map = "UVMap2"
-             uvNode2.location = (-650,-120)
-
-        # Add Image Texture nodes
-        for tx in txtrList:
-            key = tx[0]
-            if(not simpleBlendmat or (key in blendMatTranslate.keys())): # Normal material, or 4 chosen Blendmap textures ok (ignoring auto generated materials)
-                if(simpleBlendmat): key = blendMatTranslate[key] # Translate Blendmat keys 
-                bmapPath = tx[1].replace('/','\\') # 'data\art\objects...
-                tgaPath = bmapPath.replace('.bmap', '.tga') # 'data\art\objects...
-                fileName = tgaPath.split('\\')[-1]
-
-                imageNode = mat.node_tree.nodes.new('ShaderNodeTexImage')
-                imageNode.hide = True # Collapse node
-                nodeYLocation = 300+key*50*-1 # Nodes in key order
-                imageNode.location = (-250,nodeYLocation)
-
-                # Create texture node
-                if (fileName in bpy.data.images): # use existing image with same name
-                    imageNode.image = bpy.data.images.get(fileName) 
-                else: # Make new image
-
-                    # Save tga files on disk
-                    if(imp_tga and '\\data\\' in blendFolder and '\\mods\\' in blendFolder):
-                        if(bmapPath.split('_')[-1].lower() in ['c.bmap', 'c1.bmap', 'c5.bmap']): #Allowed extensions
-                            convert_bmap_file_to_image( bmapFile=dataFolderImport+bmapPath, tgaPath=dataFolderBlend+tgaPath )
-
-                    # Link in Shader Node new image datablock with relative reference to file
-                    imageNode.image = image_refer(fileName, fullPath=bpy.path.relpath(dataFolder+tgaPath,start=relativeTo)) 
-
-                # Connect texture to shader node
-                if not NodeGroupShader.loaded: # Principled BSDF
-                    mat.node_tree.links.new(bsdfNode.inputs[wf_bsdf_slots[key]], imageNode.outputs['Color'])
-                else: # Shader Nodegroup
-                    if len(wftbNode.inputs) > key:
-                        mat.node_tree.links.new(wftbNode.inputs[key], imageNode.outputs['Color'])
-                        # Connect alpha of second texture to special nodegroup alpha
-                        if(key==1 and not "#blend" in matName.lower() and ('_c1.' in tgaPath or '_c5.' in tgaPath)):
-                            mat.node_tree.links.new(wftbNode.inputs['Alpha'], imageNode.outputs['Alpha'])
-
-                # #blend scale mapping and uv node links
-                if("#blend" in matName.lower()):
-                    connect_uv_to = imageNode
-                    # Add mapping if scale exists
-                    if (key in textureScale and (textureScale[key][0]!=1 or textureScale[key][1]!=1)):
-                        mapping_node = add_mapping_node(scale=textureScale[key], linkOutputTo=imageNode, material=mat, YLocation=nodeYLocation)
-                        connect_uv_to = mapping_node
-                        if (key in [0,2,4,7] and key in textureUV): # Connect Albedo UV 1 only with mapping node
-                            if textureUV[key] == 0:
-                                mat.node_tree.links.new(mapping_node.inputs[0], uvNode1.outputs[0])
-
-                    # Connect Albedo UV 2 always
-                    if (key in [0,2,4,7] and key in textureUV):
-                        if textureUV[key] == 1: # 1 = UV2
-                            mat.node_tree.links.new(connect_uv_to.inputs[0], uvNode2.outputs[0])
-                    # Last slots connect to UV2 always
-                    if (key in [6,9,10,11]): # UV2 used by last slots
-                        mat.node_tree.links.new(connect_uv_to.inputs[0], uvNode2.outputs[0])
+        nodes = mat.node_tree.nodes
+        for i, (key, tgaPath, image) in enumerate(slots):
+            nodes['WF Texture %d' % i].image = image
+            mapping_node = nodes.get('WF Mapping %d' % i)
+            if mapping_node is not None and 'Scale' in mapping_node.inputs:
+                mapping_node.inputs['Scale'].default_value = textureScale[key]
+        return
+
+    mat = bpy.data.materials.new(matName)
+    mat.specular_intensity = spec
+    mat.roughness = gloss
+    mat.use_nodes = True
+    if clip:
+        mat.blend_method = 'CLIP'
+
+    # Material output node
+    outNode = mat.node_tree.nodes["Material Output"]
+    outNode.location = (400,300)
+
+    if(NodeGroupShader.loaded):
+        wftbNode = mat.node_tree.nodes.new('ShaderNodeGroup')
+        wftbNode.node_tree = shaderGroup
+        wftbNode.location = (100,300)
+        wftbNode.width = 240
+        mat.node_tree.nodes.remove(mat.node_tree.nodes["Principled BSDF"]) # Delete default node
+        mat.node_tree.links.new(wftbNode.outputs[0], outNode.inputs[0])
+    else:   
+        bsdfNode = mat.node_tree.nodes["Principled BSDF"]
+        bsdfNode.location = (100,300)
+
+    # #blend uv nodes
+    if(isBlend):
+         uvNode1 = mat.node_tree.nodes.new('ShaderNodeUVMap')
+         uvNode1.uv_map = "UVMap"
+         uvNode1.location = (-650,300)
+         uvNode2 = mat.node_tree.nodes.new('ShaderNodeUVMap')
+         uvNode2.uv_map = "UVMap2"
+         uvNode2.location = (-650,-120)
+
+    # Add Image Texture nodes, named by slot so copies can rebind images
+    for i, (key, tgaPath, image) in enumerate(slots):
+        imageNode = mat.node_tree.nodes.new('ShaderNodeTexImage')
+        imageNode.name = 'WF Texture %d' % i
+        imageNode.hide = True # Collapse node
+        nodeYLocation = 300+key*50*-1 # Nodes in key order
+        imageNode.location = (-250,nodeYLocation)
+        imageNode.image = image
+
+        # Connect texture to shader node
+        if not NodeGroupShader.loaded: # Principled BSDF
+            mat.node_tree.links.new(bsdfNode.inputs[wf_bsdf_slots[key]], imageNode.outputs['Color'])
+        else: # Shader Nodegroup
+            if len(wftbNode.inputs) > key:
+                mat.node_tree.links.new(wftbNode.inputs[key], imageNode.outputs['Color'])
+                # Connect alpha of second texture to special nodegroup alpha
+                if(key==1 and not isBlend and ('_c1.' in tgaPath or '_c5.' in tgaPath)):
+                    mat.node_tree.links.new(wftbNode.inputs['Alpha'], imageNode.outputs['Alpha'])
+
+        # #blend scale mapping and uv node links
+        if(isBlend):
+            connect_uv_to = imageNode
+            # Add mapping if scale exists
+            if hasMapping(key):
+                mapping_node = add_mapping_node(scale=textureScale[key], linkOutputTo=imageNode, material=mat, YLocation=nodeYLocation)
+                mapping_node.name = 'WF Mapping %d' % i
+                connect_uv_to = mapping_node
+                if (key in [0,2,4,7] and key in textureUV): # Connect Albedo UV 1 only with mapping node
+                    if textureUV[key] == 0:
+                        mat.node_tree.links.new(mapping_node.inputs[0], uvNode1.outputs[0])
+
+            # Connect Albedo UV 2 always
+            if (key in [0,2,4,7] and key in textureUV):
+                if textureUV[key] == 1: # 1 = UV2
+                    mat.node_tree.links.new(connect_uv_to.inputs[0], uvNode2.outputs[0])
+            # Last slots connect to UV2 always
+            if (key in [6,9,10,11]): # UV2 used by last slots
+                mat.node_tree.links.new(connect_uv_to.inputs[0], uvNode2.outputs[0])
+
+    MaterialTemplates.add(signature, mat)
 
 
 def make_meshes(get,filepath,imp_mat,matrix,modelName,imp_tga):
@@ -2182,16 +2652,17 @@ def import_bmap(context, filepath):
     pngfile = filepath[:-5] + '.png'
     tgafile = filepath[:-5] + '.tga'
     in_mods = '\\mods\\' in filepath 
+    cached = ImageIndex.find(ImageIndex.key(bmapcache_path))
     if in_mods and os.path.isfile(pngfile): # Use existing png if available
         imageNode.image = image_refer(fileName[:-5]+'.png', fullPath=pngfile)
     elif in_mods and os.path.isfile(tgafile): # Use existing tga if available
         imageNode.image = image_refer(fileName[:-5]+'.tga', fullPath=tgafile)
-    elif (fileName in bpy.data.images and bpy.data.images[fileName].filepath == bmapcache_path): # Use existing image from Blender if available
-        imageNode.image = bpy.data.images.get(fileName) 
+    elif cached: # Use existing image from Blender if available
+        imageNode.image = cached[0]
     else: # Make new image
 
-        # Convert and save webp file on disk
-        convert_bmap_file_to_image( bmapFile=filepath, tgaPath=bmapcache_path, quality=90, resolution=config.c_resolution, file_format='WEBP')
+        # Convert and save webp file on disk in background, low resolution preview first
+        BmapQueue.submit( bmapFile=filepath, tgaPath=bmapcache_path, quality=90, resolution=config.c_resolution, file_format='WEBP')
 
         # Link in Shader Node image datablock
         imageNode.image = image_refer(fileName, fullPath=bmapcache_path)
@@ -2232,9 +2703,10 @@ def read_scne(context, filepath, short_pth=False, use_color=False, imp_model=Fal
     if(not get.bytes): return {'FINISHED'}
 
     # Load shaders
-    NodeGroupShader.reset()
     if use_wftb:
         NodeGroupShader.load()
+    else:
+        NodeGroupShader.reset()
 
     # Increase frame rate for animation imports
     #if(imp_anim and bpy.context.scene.render.fps==24):
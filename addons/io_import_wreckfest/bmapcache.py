@@ -0,0 +1,99 @@
+""" Bmap Cache Manifest
+
+Keeps track of converted images in Wreckfest\\tools\\BmapCache\\manifest.json.
+Each .bmap file can have several tiers, for example low resolution 'preview'
+and 'full' resolution image.
+
+Converted images are stored once per .bmap content hash under BmapCache\\hash\\.
+Path based cache files are hard links to the stored image, so byte-identical
+.bmap files under different paths share disk space and conversion work.
+Textures unpacked next to mod .bmap files are always copied, so editing them
+in place never changes the shared store.
+
+Example usage:
+    import bmapcache
+    manifest = bmapcache.CacheManifest("C:\\Wreckfest\\tools\\BmapCache")
+    manifest.set("data\\art\\textures\\road_c.bmap", 'preview', "C:\\...\\road_c.cmap", (256, 256))
+    manifest.save()
+    print(manifest.get("data\\art\\textures\\road_c.bmap", 'preview'))
+
+License:
+    This program is licensed under Creative Commons CC0
+    https://creativecommons.org/publicdomain/zero/1.0/
+"""
+
+import os
+import json
+import shutil
+import threading
+
+from ...utils.fileio import file_hash, read_json, write_json
+
+def place(source, filepath, link=True):
+    """Put stored image to filepath. Hard link when possible, copy otherwise"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    if os.path.isfile(filepath):
+        os.remove(filepath)
+    if link:
+        try:
+            os.link(source, filepath)
+            return
+        except OSError:
+            pass # Different drive or no hard link support
+    shutil.copyfile(source, filepath)
+
+
+class CacheManifest:
+    """Tiers of converted images, stored as json. Thread safe"""
+    def __init__(self, folder):
+        """Load manifest from Bmap Cache folder"""
+        self.folder = folder
+        self.filepath = os.path.join(folder, 'manifest.json')
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.entries = read_json(self.filepath, {}) # Dictionary: [Relative .bmap path : {'source': {hash, size, mtime}, Tier : {path, size}}]
+
+    @staticmethod
+    def key(relpath):
+        """Manifest key for relative data\\.. path"""
+        return relpath.replace('/', '\\').lower()
+
+    def get(self, relpath, tier):
+        """Get path of image tier. None if not converted or file removed"""
+        with self.lock:
+            entry = self.entries.get(self.key(relpath), {}).get(tier)
+        if entry and os.path.isfile(entry['path']):
+            return entry['path']
+
+    def set(self, relpath, tier, path, size):
+        """Store converted image tier"""
+        with self.lock:
+            self.entries.setdefault(self.key(relpath), {})[tier] = {'path': path, 'size': list(size)}
+            self.dirty = True
+
+    def content_hash(self, relpath, filepath):
+        """Content hash of .bmap file. Reused while file size and modification time are unchanged"""
+        st = os.stat(filepath)
+        key = self.key(relpath)
+        with self.lock:
+            source = self.entries.get(key, {}).get('source')
+        if source and source['size'] == st.st_size and source['mtime'] == st.st_mtime:
+            return source['hash']
+        digest = file_hash(filepath)
+        with self.lock:
+            self.entries.setdefault(key, {})['source'] = {'hash': digest, 'size': st.st_size, 'mtime': st.st_mtime}
+            self.dirty = True
+        return digest
+
+    def store_path(self, digest, tier, extension):
+        """Path of converted image in content hash store"""
+        return os.path.join(self.folder, 'hash', digest[:2], digest + '_' + tier + '.' + extension)
+
+    def save(self):
+        """Write manifest to disk if changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps(self.entries, indent=1, sort_keys=True)
+            self.dirty = False
+        write_json(self.filepath, data)
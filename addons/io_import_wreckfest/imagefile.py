@@ -0,0 +1,112 @@
+""" Image File Writer
+
+Encodes decoded RGBA pixels directly into image files without going through
+Blender render settings. Functions only touch their own arguments, so they can
+be called from worker threads.
+
+Pixels are NumPy uint8 arrays with shape (height, width, 4), top row first.
+
+Example usage:
+    import imagefile
+    pixels = numpy.zeros((256, 256, 4), dtype=numpy.uint8)
+    imagefile.save(pixels, "C:\\temp\\black.tga", 'TARGA')
+
+License:
+    This program is licensed under Creative Commons CC0
+    https://creativecommons.org/publicdomain/zero/1.0/
+"""
+
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+
+try:
+    from PIL import Image # Optional, only used for WebP
+except ImportError:
+    Image = None
+
+
+def from_blender_pixels(flat, width, height):
+    """Convert flat float RGBA list of Blender image (bottom row first) into uint8 array"""
+    pixels = np.asarray(flat, dtype=np.float32).reshape(height, width, 4)[::-1]
+    return (np.clip(pixels, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+
+def halve(pixels):
+    """Half image size with 2x2 box filter, same as next mip level"""
+    height, width = pixels.shape[:2]
+    p = pixels.astype(np.uint16)
+    if height > 1:
+        p = p[0:height//2*2:2] + p[1:height//2*2:2]
+    else:
+        p = p*2
+    if width > 1:
+        p = p[:, 0:width//2*2:2] + p[:, 1:width//2*2:2]
+    else:
+        p = p*2
+    return ((p + 2) // 4).astype(np.uint8)
+
+def downscale(pixels, resolution):
+    """Halve image until it fits into resolution*resolution pixels"""
+    while pixels.shape[0]*pixels.shape[1] > resolution*resolution:
+        pixels = halve(pixels)
+    return pixels
+
+def encode_tga(pixels):
+    """Encode uncompressed 32 bit TGA"""
+    height, width = pixels.shape[:2]
+    header = struct.pack('<BBBHHBHHHHBB',
+        0, # ID length
+        0, # No color map
+        2, # Uncompressed true-color
+        0, 0, 0, # Color map specification
+        0, 0, # X, Y origin
+        width, height,
+        32, # Bits per pixel
+        8 | 0x20) # 8 alpha bits, top-left origin
+    bgra = pixels[:, :, [2, 1, 0, 3]] # TGA stores BGRA
+    return header + np.ascontiguousarray(bgra).tobytes()
+
+def encode_png(pixels, level=6):
+    """Encode 8 bit RGBA PNG"""
+    height, width = pixels.shape[:2]
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+    # Filter type 0 (None) byte in front of every row
+    rows = np.zeros((height, width*4 + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape(height, width*4)
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0) # 8 bit, RGBA
+    return (b'\x89PNG\r\n\x1a\n' +
+        chunk(b'IHDR', ihdr) +
+        chunk(b'IDAT', zlib.compress(rows.tobytes(), level)) +
+        chunk(b'IEND', b''))
+
+def encode_webp(pixels, quality=90):
+    """Encode WebP. Falls back to PNG when Pillow is not available"""
+    if Image is None:
+        return encode_png(pixels) # Blender detects format from file content, not extension
+    import io
+    data = io.BytesIO()
+    Image.fromarray(pixels, 'RGBA').save(data, format='WEBP', quality=quality)
+    return data.getvalue()
+
+def encode(pixels, file_format='TARGA', quality=90):
+    """Encode pixels using Blender image format name"""
+    if file_format in ['TARGA', 'TARGA_RAW']:
+        return encode_tga(pixels)
+    if file_format == 'PNG':
+        return encode_png(pixels)
+    if file_format == 'WEBP':
+        return encode_webp(pixels, quality)
+    raise ValueError('Unsupported image format: '+str(file_format))
+
+def save(pixels, filename, file_format='TARGA', quality=90):
+    """Encode pixels and write image file to disk"""
+    data = encode(pixels, file_format, quality)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    # Write to temporary file first, readers never see half written image
+    tmpname = '%s.%d-%d.tmp' % (filename, os.getpid(), threading.get_ident())
+    with open(tmpname, 'wb') as f:
+        f.write(data)
+    os.replace(tmpname, filename)
@@ -24,6 +24,7 @@ import os
 import re
 import sys
 import subprocess
+import time
 import bmesh
 import mathutils
 import bpy.utils.previews
@@ -589,27 +590,36 @@ class BUGMENU_OT_set_shader(bpy.types.Operator):
             }
 
 
-        def capture_inputs(node):
-            nodes_at_inputs = {} # Create dict of linked Nodes
-            id = -1
-            for ninput in node.inputs:
-                id += 1
-                if ninput.is_linked:
-                    if node.type == 'BSDF_PRINCIPLED': # Reorder inputs, skip if not found
+        def is_shader_node(nd):
+            return (nd.type == 'BSDF_PRINCIPLED' or nd.name == "Wreckfest Wrapper" or # BSDF or Wrapper
+                nd.type == 'GROUP' and nd.node_tree is not None and ("#" in nd.node_tree.name or "#" in nd.label)) # or nodegroup shader
+
+        def capture_links(tree, targets):
+            '''Links of all replaced nodes in one pass over tree links. Links between replaced nodes are dropped'''
+            socket_ids = {} # Dictionary: [Input socket pointer : (Node name, Input id)]
+            for name, nd in targets.items():
+                for id, ninput in enumerate(nd.inputs):
+                    if nd.type == 'BSDF_PRINCIPLED': # Reorder inputs, skip if not found
                         if ninput.name in wf_bsdf_slots:
-                            nodes_at_inputs.update({wf_bsdf_slots[ninput.name]: ninput.links[0].from_socket}) # {Id: First node in socket}
+                            socket_ids[ninput.as_pointer()] = (name, wf_bsdf_slots[ninput.name])
                     else:
-                        nodes_at_inputs.update({id: ninput.links[0].from_socket}) # {Id: First node in socket}
-            return nodes_at_inputs
-
-        def capture_output(node):
-            if len(node.outputs) > 0 and node.outputs[0].is_linked:
-                return node.outputs[0].links[0].to_socket
-            return None
+                        socket_ids[ninput.as_pointer()] = (name, id)
+            nodes_at_inputs = {name: {} for name in targets} # Dictionary: [Node name : {Id: First node in socket}]
+            node_at_output = {} # Dictionary: [Node name : First socket linked to output]
+            for link in tree.links:
+                from_name, to_name = link.from_node.name, link.to_node.name
+                if to_name in targets and from_name not in targets:
+                    target = socket_ids.get(link.to_socket.as_pointer())
+                    if target:
+                        nodes_at_inputs[target[0]].setdefault(target[1], link.from_socket)
+                elif from_name in targets and to_name not in targets:
+                    if link.from_socket.as_pointer() == targets[from_name].outputs[0].as_pointer():
+                        node_at_output.setdefault(from_name, link.to_socket)
+            return nodes_at_inputs, node_at_output
 
         def add_nodegroup_node(tree,linked_nodes,material):
             nd = tree.nodes.new("ShaderNodeGroup")
-            nd.node_tree = bpy.data.node_groups[self.shader]
+            nd.node_tree = group
             max_input = len(nd.inputs)
             # Fix viewport transparency
             if bpy.app.version<(4,2) and material.blend_method=='OPAQUE':
@@ -637,36 +647,52 @@ class BUGMENU_OT_set_shader(bpy.types.Operator):
         # Skip if shader no longer exists (quick menu)
         if self.shader not in bpy.data.node_groups.keys()+['Principled BSDF']:
             return {'FINISHED'} 
+        group = bpy.data.node_groups.get(self.shader)
+        start = time.time()
 
-        updated_node_trees = []
+        # Plan all swaps first. Each node tree once, first material slot using it decides
+        plans = {} # Dictionary: [Node tree pointer : (Material, Node tree, Names of nodes to replace)]
         for obj in bpy.context.selected_objects:
-                for slot in obj.material_slots:
-                    if slot.material and slot.material.node_tree and slot.material.node_tree.nodes: # Skip materials without nodes
-                        print('Material "'+slot.material.name+'" shader replace')
-                        tree = slot.material.node_tree
-                        if tree not in updated_node_trees: # Skip already updated materials
-                            updated_node_trees.append(tree)
-                            for nd_name in tree.nodes.keys(): # Loop nodes. keys() copy to list to prevent infinite loop.
-                                nd = tree.nodes[nd_name] 
-                                if (nd.type == 'BSDF_PRINCIPLED' or nd.name == "Wreckfest Wrapper" or # BSDF or Wrapper
-                                    nd.type == 'GROUP' and ("#" in nd.node_tree.name or "#" in nd.label)): # or nodegroup shader
-                                    if(slot.material==obj.active_material or nd.type == 'BSDF_PRINCIPLED' and '#pbr' in self.shader): # Active material or BSDF to #pbr
-                                        # Capture node links and properties
-                                        nodes_at_inputs = capture_inputs(nd)
-                                        node_at_output = capture_output(nd)
-                                        location = nd.location.x, nd.location.y
-                                        width = nd.width
-                                        # Remove node
-                                        tree.nodes.remove(nd)
-                                        # Create new node
-                                        if self.shader == 'Principled BSDF': # If chosen menu option to Principled BSDF
-                                            new_node = add_bsdf_node(tree,nodes_at_inputs)
-                                        else:
-                                            new_node = add_nodegroup_node(tree,nodes_at_inputs,slot.material)
-                                        # Restores links and properties
-                                        new_node.location = location
-                                        new_node.width = width
-                                        if node_at_output and len(new_node.outputs)>0: tree.links.new(new_node.outputs[0], node_at_output)
+            for slot in obj.material_slots:
+                material = slot.material
+                if not (material and material.node_tree and material.node_tree.nodes): # Skip materials without nodes
+                    continue
+                tree = material.node_tree
+                if tree.as_pointer() in plans: # Skip already updated materials
+                    continue
+                active = material == obj.active_material
+                names = [nd.name for nd in tree.nodes if is_shader_node(nd) and
+                    (active or nd.type == 'BSDF_PRINCIPLED' and '#pbr' in self.shader)] # Active material or BSDF to #pbr
+                plans[tree.as_pointer()] = (material, tree, names)
+
+        # Replace nodes
+        replaced = 0
+        changed = 0 # Materials with at least one node swapped
+        for material, tree, names in plans.values():
+            if not names:
+                continue
+            changed += 1
+            targets = {name: tree.nodes[name] for name in names}
+            nodes_at_inputs, node_at_output = capture_links(tree, targets)
+            for name, nd in targets.items():
+                location = nd.location.x, nd.location.y
+                width = nd.width
+                # Remove node
+                tree.nodes.remove(nd)
+                # Create new node
+                if self.shader == 'Principled BSDF': # If chosen menu option to Principled BSDF
+                    new_node = add_bsdf_node(tree,nodes_at_inputs[name])
+                else:
+                    new_node = add_nodegroup_node(tree,nodes_at_inputs[name],material)
+                # Restores links and properties
+                new_node.location = location
+                new_node.width = width
+                if name in node_at_output and len(new_node.outputs)>0: tree.links.new(new_node.outputs[0], node_at_output[name])
+                replaced += 1
+
+        elapsed = time.time() - start
+        self.report({'INFO'}, "Shader set on %d nodes in %d materials in %.2f s (%d materials/s)" %
+            (replaced, changed, elapsed, changed/max(elapsed, 0.001)))
         return {'FINISHED'}        
 
 class BUGMENU_OT_setzerospec(bpy.types.Operator):
@@ -15,17 +15,31 @@ bl_info = {
 
 import bpy
 import os
+from bpy.app.handlers import persistent
 
-class WF_SHADERS_OT_append_wf_shaders(bpy.types.Operator):
-    """Add Wreckfest shaders into current file"""
-    bl_idname = "wf_shaders.append_wf_shaders"
-    bl_label = "Load Node Group Shaders"
-    bl_options = {'REGISTER', 'UNDO'}
-    def execute(self, context):
-        addon_folder = os.path.dirname(os.path.realpath(__file__))
-        filepath = os.path.join(addon_folder,'shaders.blend')
-        # Rename existing corrupted shaders with "(broken)"
+class ShaderLibrary():
+    """Node group catalogue of shaders.blend and broken node group check, cached between appends"""
+    mtime = None # Modification time of shaders.blend when catalogue was read
+    names = [] # Node group names in shaders.blend
+    checked = {} # Dictionary: [Node group pointer : (Name, Node count) when checked for broken nodes]
+
+    @classmethod
+    def catalogue(self, filepath):
+        """Node group names in library. Library is opened only when file has changed"""
+        mtime = os.path.getmtime(filepath)
+        if mtime != self.mtime:
+            with bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
+                self.names = list(data_from.node_groups)
+            self.mtime = mtime
+        return self.names
+
+    @classmethod
+    def mark_broken(self):
+        """Rename existing corrupted shaders with "(broken)". Only groups changed since last check are scanned"""
         for group in bpy.data.node_groups:
+            state = (group.name, len(group.nodes))
+            if self.checked.get(group.as_pointer()) == state:
+                continue
             for node in group.nodes:
                 if node.bl_idname == 'NodeUndefined':
                     try:
@@ -33,26 +47,72 @@ class WF_SHADERS_OT_append_wf_shaders(bpy.types.Operator):
                     except:
                         print('Node Group is corrupted:', group.name)
                     break
+            self.checked[group.as_pointer()] = (group.name, len(group.nodes))
+
+    @classmethod
+    def reset(self):
+        """Forget checked groups. Pointers can be reused for other groups after load or undo"""
+        self.checked.clear()
+
+
+@persistent
+def shader_library_reset(*args):
+    ShaderLibrary.reset()
+
+reset_handlers = (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post)
+
+
+class WF_SHADERS_OT_append_wf_shaders(bpy.types.Operator):
+    """Add Wreckfest shaders into current file"""
+    bl_idname = "wf_shaders.append_wf_shaders"
+    bl_label = "Load Node Group Shaders"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    groups : bpy.props.StringProperty(
+        name="Groups",
+        description="Comma separated node group names or #tags to append, helper groups without #tag are always included. Empty appends all",
+        default='',
+        options={'HIDDEN', 'SKIP_SAVE'})
+
+    def execute(self, context):
+        addon_folder = os.path.dirname(os.path.realpath(__file__))
+        filepath = os.path.join(addon_folder,'shaders.blend')
+        ShaderLibrary.mark_broken()
         # Append new shaders
         if os.path.exists(filepath):
+            wanted = [name.strip() for name in self.groups.split(',') if name.strip()]
+            existing = set(bpy.data.node_groups.keys())
+            missing = []
+            for group_name in ShaderLibrary.catalogue(filepath):
+                tag = group_name.strip().split(' ', maxsplit=1)[0]
+                helper = '#' not in group_name # WF Mapping, UV Flipbook etc. used by tagged shaders and importer
+                if wanted and not helper and group_name not in wanted and not any(tag in name for name in wanted if tag.startswith('#')):
+                    continue # Not requested. Tag inside requested name counts, e.g. #pbr for #pbr_tiled
+                if group_name not in existing and group_name+' #export' not in existing:
+                    missing += [group_name]
+            if not missing:
+                return {'FINISHED'} # Nothing to do, library is not opened
             with bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
-                print("\nAppend node groups:  ", end='')
-                for group_name in data_from.node_groups:
-                    if group_name not in bpy.data.node_groups.keys() and group_name+' #export' not in bpy.data.node_groups.keys():
-                        print(group_name, end=', ')
-                        data_to.node_groups += [group_name]
-                print('')
+                print("\nAppend node groups:  ", ', '.join(missing))
+                data_to.node_groups = missing
             # Make #pbr nodes permanent
             for group in data_to.node_groups:
-                if '#pbr' in group.name:
+                if group is not None and '#pbr' in group.name:
                     group.use_fake_user = True
         return {'FINISHED'}
 
 
 def register():
     bpy.utils.register_class(WF_SHADERS_OT_append_wf_shaders)
+    for handlers in reset_handlers:
+        if shader_library_reset not in handlers:
+            handlers.append(shader_library_reset)
 
 def unregister():
+    for handlers in reset_handlers:
+        if shader_library_reset in handlers:
+            handlers.remove(shader_library_reset)
+    ShaderLibrary.reset()
     bpy.utils.unregister_class(WF_SHADERS_OT_append_wf_shaders)
 
 if __name__ == "__main__":
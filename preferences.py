@@ -1,8 +1,6 @@
 """Addon preferences that are saved inbetween sesions."""
 import bpy
 import os.path
-import subprocess
-import threading
 from os import path, environ
 
 
@@ -123,12 +121,33 @@ class WreckfestToolboxAddonPreference(bpy.types.AddonPreferences):
         default=True
     )
 
+    incremental_export: bpy.props.BoolProperty(
+        name="Incremental Export",
+        description="Reuse mesh data of previous export for objects that have not changed",
+        default=True
+    )
+
+    split_subscenes: bpy.props.BoolProperty(
+        name="Split Subscenes",
+        description="Export top level collections with #subscene in name to their own .bgo3 files, "
+                    "referenced from the main file with #xref. Only changed subscenes are built again",
+        default=False
+    )
+
     build_bmap: bpy.props.BoolProperty(
         name="Build Bmap",
         description="Build .bmap textures using bimage.exe",
         default=True
     )
 
+    build_jobs: bpy.props.IntProperty(
+        name="Build Jobs",
+        description="How many bimage.exe and bgeometry.exe processes can run at the same time",
+        default=min(4, os.cpu_count() or 1),
+        min=1,
+        max=32
+    )
+
     build_after_export: bpy.props.BoolProperty(
         name="Build After Export",
         description="Launch the Build Asset Script in background "
@@ -149,23 +168,3 @@ class WreckfestToolboxAddonPreference(bpy.types.AddonPreferences):
 
         row = layout.row()
         row.prop(self, "username")
-
-    @staticmethod
-    def popen_and_call(on_exit, popen_args):
-        """
-        Runs the given args in a subprocess.Popen, and then calls the function
-        on_exit when the subprocess completes.
-        on_exit is a callable object, and popen_args is a list/tuple of args that
-        would give to subprocess.Popen.
-        """
-
-        def run_in_thread(on_exit_event, popen_args_list):
-            proc = subprocess.Popen(popen_args_list)
-            proc.wait()
-            on_exit_event()
-            return
-
-        thread = threading.Thread(target=run_in_thread, args=(on_exit, popen_args))
-        thread.start()
-        # returns immediately after the thread starts
-        return thread
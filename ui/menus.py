@@ -1,5 +1,6 @@
 import bpy
 from wreckfest_toolbox.utils.wreckfest_custom_parts_properties import CustomPartsProperties
+from wreckfest_toolbox.utils import export_bgo
 
 # Create a Wreckfest menu on the right panel of 3D view
 class WFTB_PT_wreckfest_toolbox_panel(bpy.types.Panel):
@@ -56,7 +57,11 @@ class WFTB_PT_wreckfest_toolbox_panel(bpy.types.Panel):
             box.label(text="Export :", icon="EXPORT")
             box.prop(prefs, "apply_modifiers")
             box.prop(prefs, "bake_animation")
+            box.prop(prefs, "incremental_export")
+            box.prop(prefs, "split_subscenes")
             box.prop(prefs, "build_bmap")
+            if prefs.build_bmap:
+                box.prop(prefs, "build_jobs")
             box.prop(prefs, "build_after_export")
             # TODO : Implement this
             # row.prop(prefs, "auto_split_edge")
@@ -71,6 +76,17 @@ class WFTB_PT_wreckfest_toolbox_panel(bpy.types.Panel):
                 row.operator("wftb.export_bgo", text="Direct Export", icon="EXPORT")
             row.operator("wftb.export_bgo_with_dialog", text="Set Path & Export", icon="FILEBROWSER")
             row.scale_y = 2
+            if context.scene.get("wftb_bgo_export_path"):
+                row = box.row(align=True)
+                row.operator("wftb.export_watch", text="Auto Export", icon="REC" if export_bgo.ExportWatch.enabled else "PLAY",
+                    depress=export_bgo.ExportWatch.enabled)
+            # Background build status
+            status = export_bgo.build_service.status()
+            if status:
+                row = box.row(align=True)
+                last = export_bgo.build_service.last
+                row.alert = not export_bgo.build_service.busy and last is not None and last.failed
+                row.label(text=status, icon="ERROR" if row.alert else "SETTINGS")
 
         elif props.panel_enums == "SETTINGS":
             row.label(text="Addon Settings")
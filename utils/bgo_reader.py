@@ -0,0 +1,332 @@
+"""BGO3 file reader
+
+Reads .bgo3 files written by the exporter into dictionaries, with matrices
+and mesh data as NumPy arrays. Does not use bpy, so exported files can be
+checked outside of Blender. diff() lists differences between two files chunk
+by chunk.
+
+Example usage:
+    python bgo_reader.py track.bgo3
+    python bgo_reader.py diff old.bgo3 new.bgo3
+
+    import bgo_reader
+    bgo = bgo_reader.read("C:\\temp\\track.bgo3")
+    print([ob['name'] for ob in bgo['objects']])
+"""
+
+import sys
+import struct
+import numpy as np
+
+
+class BgoReadError(ValueError):
+    pass
+
+
+class ChunkReader:
+    """Sequential reader of little endian BGO data"""
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, fmt):
+        fmt = '<' + fmt
+        try:
+            values = struct.unpack_from(fmt, self.data, self.offset)
+        except struct.error:
+            raise BgoReadError('Unexpected end of file at %d' % self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def uint(self):
+        return self.read('I')[0]
+
+    def cstring(self):
+        end = self.data.find(b'\x00', self.offset)
+        if end == -1:
+            raise BgoReadError('Unterminated string at %d' % self.offset)
+        text = self.data[self.offset:end].decode('utf-8', 'replace')
+        self.offset = end + 1
+        return text
+
+    def matrix(self):
+        return np.array(self.read('16f'), dtype=np.float32).reshape(4, 4)
+
+    def array(self, dtype, count):
+        dtype = np.dtype(dtype)
+        end = self.offset + dtype.itemsize * count
+        if end > len(self.data):
+            raise BgoReadError('Unexpected end of file at %d' % self.offset)
+        values = np.frombuffer(self.data, dtype=dtype, count=count, offset=self.offset)
+        self.offset = end
+        return values
+
+    def header(self, expected):
+        """Read chunk header. Returns offset where chunk ends"""
+        start = self.offset
+        length, name = self.read('I4s')
+        name = name.decode('ascii', 'replace')
+        if name not in expected:
+            raise BgoReadError('Expected %s chunk at %d, found %r' % ('/'.join(expected), start, name))
+        if name in ('HIER', 'OBJM', 'OBJD', 'OBJX', 'GMSH'): # Length without header
+            length += 8
+        return name, start + length
+
+    def end(self, name, end):
+        if self.offset != end:
+            raise BgoReadError('%s chunk length does not match content (%d != %d)' % (name, end, self.offset))
+
+
+def read_info(r):
+    name, end = r.header(['INFO'])
+    info = {'version': r.uint(), 'format': r.cstring(), 'username': r.cstring()}
+    r.end(name, end)
+    return info
+
+def read_texture(r):
+    name, end = r.header(['TEXC'])
+    slot, uv, _ = r.read('3I')
+    texture = {'slot': slot, 'uv': uv, 'matrix': r.matrix(), 'path': r.cstring()}
+    r.end(name, end)
+    return texture
+
+def read_material(r):
+    name, end = r.header(['MATC'])
+    r.read('32x')
+    values = r.read('9f3f')
+    r.read('I4xI4x')
+    material = {
+        'diffuse': values[0:3],
+        'specular': values[6:9],
+        'roughness': values[9],
+        'specular_intensity': values[10],
+        'alpha': values[11],
+        'name': r.cstring(),
+    }
+    material['textures'] = [read_texture(r) for i in range(r.uint())]
+    r.end(name, end)
+    return material
+
+def read_materials(r):
+    name, end = r.header(['MLST'])
+    materials = [read_material(r) for i in range(r.uint())]
+    r.end(name, end)
+    return materials
+
+def read_gmesh(r):
+    name, end = r.header(['GMSH'])
+    triangles, uv_layers = r.read('2I')
+    # Per corner: material, position, then per uv layer: uv, normal, tangent, binormal
+    vertices = r.array('<f4', triangles * 3 * (4 + 11 * uv_layers)).reshape(triangles * 3, 4 + 11 * uv_layers)
+    r.end(name, end)
+    return {'triangles': triangles, 'uv_layers': uv_layers, 'vertices': vertices}
+
+def read_object(r):
+    object_type, end = r.header(['OBJM', 'OBJD', 'OBJX'])
+    parent, _ = r.read('2I')
+    ob = {'type': object_type, 'parent': parent, 'matrix': r.matrix(), 'pivot': r.matrix()}
+    r.read('2I')
+    ob['name'] = r.cstring()
+    ob['custom_data'] = r.cstring()
+    if object_type == 'OBJM':
+        ob['mesh_id'] = r.uint()
+        ob['mesh'] = read_gmesh(r)
+    elif object_type == 'OBJX':
+        ob['xref'] = r.cstring()
+    r.end(object_type, end)
+    return ob
+
+def read_objects(r):
+    name, end = r.header(['HIER'])
+    objects = [read_object(r) for i in range(r.uint())]
+    r.end(name, end)
+    return objects
+
+ASMP_DTYPE = np.dtype([('time', '<u4'), ('matrix', '<f4', (4, 4))])
+
+def read_animations(r):
+    name, end = r.header(['ANFO'])
+    animations = {'header': r.read('5I8I'), 'objects': {}} # Dictionary: [Object id : Keyframes]
+    while r.offset < end:
+        anim_name, anim_end = r.header(['ANIM'])
+        object_id = r.uint()
+        asmp_name, asmp_end = r.header(['ASMP'])
+        animations['objects'][object_id] = r.array(ASMP_DTYPE, r.uint())
+        r.end(asmp_name, asmp_end)
+        r.end(anim_name, anim_end)
+    r.end(name, end)
+    return animations
+
+def parse(data):
+    """Read BGO3 file content"""
+    r = ChunkReader(data)
+    length, name = r.read('I4s')
+    if name != b'MAIN':
+        raise BgoReadError('Not a BGO3 file')
+    if length != len(data):
+        raise BgoReadError('File length %d does not match header %d' % (len(data), length))
+    bgo = {
+        'info': read_info(r),
+        'materials': read_materials(r),
+        'objects': read_objects(r),
+        'animations': {'header': None, 'objects': {}},
+    }
+    if r.offset < len(data):
+        bgo['animations'] = read_animations(r)
+    if r.offset != len(data):
+        raise BgoReadError('%d bytes of unknown data at end of file' % (len(data) - r.offset))
+    return bgo
+
+def read(filepath):
+    with open(filepath, 'rb') as f:
+        return parse(f.read())
+
+
+def summary(bgo):
+    """Lines describing file content"""
+    lines = ['INFO: %(format)s %(version)d by %(username)s' % bgo['info'],
+        'MLST: %d materials' % len(bgo['materials'])]
+    for material in bgo['materials']:
+        lines.append('  %s: %d textures' % (material['name'], len(material['textures'])))
+    lines.append('HIER: %d objects' % len(bgo['objects']))
+    for ob in bgo['objects']:
+        text = '  %s %s' % (ob['type'], ob['name'])
+        if 'mesh' in ob:
+            text += ': %d triangles, %d uv layers' % (ob['mesh']['triangles'], ob['mesh']['uv_layers'])
+        if 'xref' in ob:
+            text += ': ' + ob['xref']
+        lines.append(text)
+    animated = bgo['animations']['objects']
+    lines.append('ANFO: %d animated objects, %d keyframes' % (len(animated), sum(len(keys) for keys in animated.values())))
+    return lines
+
+def by_name(items):
+    """Dictionary by name, duplicates get #2, #3 suffix"""
+    named = {}
+    for item in items:
+        name = item['name']
+        n = 1
+        while name in named:
+            n += 1
+            name = '%s #%d' % (item['name'], n)
+        named[name] = item
+    return named
+
+def max_difference(a, b):
+    return float(np.abs(np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)).max(initial=0))
+
+def diff_named(kind, a, b, compare):
+    lines = []
+    a, b = by_name(a), by_name(b)
+    lines += ['  - %s %s' % (kind, name) for name in a if name not in b]
+    lines += ['  + %s %s' % (kind, name) for name in b if name not in a]
+    for name in a:
+        if name in b:
+            changes = compare(a[name], b[name])
+            if changes:
+                lines.append('  ~ %s %s: %s' % (kind, name, ', '.join(changes)))
+    return lines
+
+def compare_materials(a, b):
+    changes = [key for key in ('diffuse', 'specular', 'roughness', 'specular_intensity', 'alpha')
+        if max_difference(a[key], b[key]) > 0]
+    ta = [(t['slot'], t['uv'], t['path']) for t in a['textures']]
+    tb = [(t['slot'], t['uv'], t['path']) for t in b['textures']]
+    if ta != tb or any(max_difference(x['matrix'], y['matrix']) > 0 for x, y in zip(a['textures'], b['textures'])):
+        changes.append('textures')
+    return changes
+
+def compare_objects(a, b, tolerance):
+    changes = [key for key in ('type', 'parent', 'custom_data', 'xref', 'mesh_id') if a.get(key) != b.get(key)]
+    for key in ('matrix', 'pivot'):
+        difference = max_difference(a[key], b[key])
+        if difference > tolerance:
+            changes.append('%s (max %.6g)' % (key, difference))
+    ma, mb = a.get('mesh'), b.get('mesh')
+    if ma is not None and mb is not None:
+        if ma['vertices'].shape != mb['vertices'].shape:
+            changes.append('mesh %d -> %d triangles, %d -> %d uv layers' % (
+                ma['triangles'], mb['triangles'], ma['uv_layers'], mb['uv_layers']))
+        else:
+            difference = max_difference(ma['vertices'], mb['vertices'])
+            if difference > tolerance:
+                columns = np.abs(ma['vertices'].astype(np.float64) - mb['vertices']).max(axis=0) > tolerance
+                changes.append('mesh data (max %.6g in columns %s)' % (difference, np.flatnonzero(columns).tolist()))
+    return changes
+
+def diff(a, b, tolerance=0.0):
+    """Differences of two parsed files, empty list when equal. Float differences up to tolerance are ignored"""
+    lines = []
+    changes = [key for key in a['info'] if a['info'][key] != b['info'][key]]
+    if changes:
+        lines.append('INFO: ' + ', '.join(changes))
+
+    material_lines = diff_named('material', a['materials'], b['materials'], compare_materials)
+    if [m['name'] for m in a['materials']] != [m['name'] for m in b['materials']]:
+        material_lines.insert(0, '  order or ids changed')
+    if material_lines:
+        lines += ['MLST: %d -> %d materials' % (len(a['materials']), len(b['materials']))] + material_lines
+
+    object_lines = diff_named('object', a['objects'], b['objects'], lambda x, y: compare_objects(x, y, tolerance))
+    if [ob['name'] for ob in a['objects']] != [ob['name'] for ob in b['objects']]:
+        object_lines.insert(0, '  order or ids changed')
+    if object_lines:
+        lines += ['HIER: %d -> %d objects' % (len(a['objects']), len(b['objects']))] + object_lines
+
+    anim_lines = []
+    if a['animations']['header'] != b['animations']['header']:
+        anim_lines.append('  header changed')
+    ka, kb = a['animations']['objects'], b['animations']['objects']
+    for object_id in sorted(set(ka) | set(kb)):
+        if object_id not in kb:
+            anim_lines.append('  - object %d' % object_id)
+        elif object_id not in ka:
+            anim_lines.append('  + object %d' % object_id)
+        elif len(ka[object_id]) != len(kb[object_id]):
+            anim_lines.append('  ~ object %d: %d -> %d keyframes' % (object_id, len(ka[object_id]), len(kb[object_id])))
+        elif (ka[object_id]['time'] != kb[object_id]['time']).any():
+            anim_lines.append('  ~ object %d: keyframe times' % object_id)
+        else:
+            difference = max_difference(ka[object_id]['matrix'], kb[object_id]['matrix'])
+            if difference > tolerance:
+                anim_lines.append('  ~ object %d: matrices (max %.6g)' % (object_id, difference))
+    if anim_lines:
+        lines += ['ANFO:'] + anim_lines
+    return lines
+
+def diff_files(path_a, path_b, tolerance=0.0):
+    with open(path_a, 'rb') as f:
+        data_a = f.read()
+    with open(path_b, 'rb') as f:
+        data_b = f.read()
+    if data_a == data_b:
+        return []
+    lines = diff(parse(data_a), parse(data_b), tolerance)
+    if not lines: # Same content, different bytes. For example -0.0 and 0.0
+        lines.append('Files differ only in float bit patterns')
+    return lines
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog='bgo_reader', description='Show or compare .bgo3 files')
+    parser.add_argument('files', nargs='+', help='file.bgo3, or: diff old.bgo3 new.bgo3')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='Ignore float differences up to this')
+    args = parser.parse_args(argv)
+    try:
+        if args.files[0] == 'diff':
+            if len(args.files) != 3:
+                parser.error('diff needs two files')
+            lines = diff_files(args.files[1], args.files[2], args.tolerance)
+            print('\n'.join(lines) if lines else 'Files are identical')
+            return 1 if lines else 0
+        for filepath in args.files:
+            print(filepath)
+            print('\n'.join(summary(read(filepath))))
+    except (OSError, BgoReadError) as e:
+        print('Error:', e)
+        return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
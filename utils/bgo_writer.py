@@ -0,0 +1,136 @@
+"""In-memory BGO file builder
+
+Chunks are written into a bytearray and their length fields are patched in
+place once the chunk is complete. The finished file is written to disk with a
+single write through a temporary file, so bgeometry.exe never sees a half
+written .bgo3 file.
+
+Chunk helpers and GMSH encoding don't need bpy, so written files can be
+checked without Blender, see test_bgo_reader.py.
+"""
+
+import os
+import struct
+import numpy as np
+
+
+class BgoWriter:
+    """File-like buffer for BGO chunks"""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+
+    def tell(self):
+        return len(self.buffer)
+
+    def patch_uint(self, offset, value):
+        """Overwrite 32-bit unsigned int at offset, used for chunk lengths"""
+        struct.pack_into('I', self.buffer, offset, value)
+
+    def getvalue(self):
+        return bytes(self.buffer)
+
+    def matches(self, filepath):
+        """Check if file on disk has exactly the same content"""
+        try:
+            if os.path.getsize(filepath) != len(self.buffer):
+                return False
+            with open(filepath, 'rb') as f:
+                return f.read() == self.buffer
+        except OSError:
+            return False
+
+    def save(self, filepath, atomic=True):
+        """Write buffer to file. Atomic save replaces old file only after new one is complete"""
+        if not atomic:
+            with open(filepath, 'wb') as f:
+                f.write(self.buffer)
+            return
+        tmpname = '%s.%d.tmp' % (filepath, os.getpid())
+        try:
+            with open(tmpname, 'wb') as f:
+                f.write(self.buffer)
+            os.replace(tmpname, filepath)
+        except:
+            if os.path.isfile(tmpname):
+                os.remove(tmpname)
+            raise
+
+
+def create_header(header_name, header_size, file):
+    """Start chunk. Returns offset of length field, patched later with write_filelen"""
+    file.write(struct.pack('I', header_size))
+    file.write(bytes(header_name, 'utf-8'))
+    return file.tell() - 8
+
+def write_filelen(offset, file, additional_adding=0):
+    final_filelen = file.tell() - offset + additional_adding
+    file.patch_uint(offset, final_filelen)
+    return final_filelen
+
+def write_cstring(string, file):
+    file.write(bytes(string + '\x00', 'utf-8'))
+
+def write_info(file, username):
+    info_start_offset = create_header('INFO', 0, file)
+    file.write(struct.pack('I', 777))
+    write_cstring('BGO', file)
+    write_cstring(username, file)
+    write_filelen(info_start_offset, file)
+
+def write_gmesh(file, encoded):
+    """Write GMSH chunk from encode_gmesh result"""
+    gmesh_start_offset = create_header('GMSH', 0, file)
+    tris, uv_layers, data = encoded
+    file.write(struct.pack('II', tris, uv_layers))
+    file.write(data)
+    write_filelen(gmesh_start_offset, file, -8)
+
+def encode_gmesh(arrays):
+    """GMSH triangle data from mesh arrays. Returns (triangle count, uv layer count, bytes)"""
+    tri_count = len(arrays['tri_materials'])
+    loops = arrays['tri_loops'].reshape(-1, 3)[:, ::-1].ravel() # Reversed winding
+    verts = arrays['loop_verts'][loops]
+
+    # Local material id to scene material id, missing slots use 0
+    material_ids = arrays['material_ids']
+    tri_materials = arrays['tri_materials']
+    mat_index = np.zeros(tri_count, dtype=np.float32)
+    valid = tri_materials < len(material_ids)
+    mat_index[valid] = material_ids[tri_materials[valid]]
+
+    tangents = arrays.get('tangents')
+    if tangents:
+        # MikkTSpace tangent of each uv map, bitangent from sign
+        normal = arrays['loop_normals'][loops]
+        tangent_layers = []
+        for tangent, sign in tangents:
+            tangent = tangent[loops]
+            tangent_layers.append((tangent, np.cross(normal, tangent) * sign[loops][:, None]))
+    else:
+        # Approximate tangent from vertex normal: normal cross Z or normal cross Y, whichever is longer
+        normal = arrays['normals'][verts].astype(np.float64)
+        zero = np.zeros(len(normal))
+        c1p = np.column_stack((normal[:, 1], -normal[:, 0], zero)) # normal x (0, 0, 1)
+        c2p = np.column_stack((-normal[:, 2], zero, normal[:, 0])) # normal x (0, 1, 0)
+        use_c1p = (c1p * c1p).sum(axis=1) > (c2p * c2p).sum(axis=1)
+        tangent = np.where(use_c1p[:, None], c1p, c2p)
+        tangent_layers = [(tangent, np.cross(normal, tangent))] * len(arrays['uvs']) # Same for every uv layer
+
+    # Interleave: material, position, then per uv layer: uv, normal, tangent, binormal. Y and Z swapped
+    uvs = arrays['uvs']
+    out = np.empty((len(loops), 4 + 11 * len(uvs)), dtype=np.float32)
+    out[:, 0] = np.repeat(mat_index, 3)
+    out[:, 1:4] = arrays['co'][verts][:, [0, 2, 1]]
+    for i, uv in enumerate(uvs):
+        base = 4 + 11 * i
+        tangent, binormal = tangent_layers[i]
+        uv = uv[loops]
+        out[:, base] = uv[:, 0]
+        out[:, base + 1] = 1 - uv[:, 1]
+        out[:, base + 2:base + 5] = normal[:, [0, 2, 1]]
+        out[:, base + 5:base + 8] = tangent[:, [0, 2, 1]]
+        out[:, base + 8:base + 11] = binormal[:, [0, 2, 1]]
+    return tri_count, len(uvs), out.tobytes()
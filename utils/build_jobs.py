@@ -0,0 +1,157 @@
+"""Background build jobs
+
+Runs Wreckfest tools like bimage.exe in background with a limit on how many
+processes run at once. Jobs are identified by their output file, so the same
+file is never built twice in one export. Jobs with lower priority number run
+first. Once all jobs have finished, waiting callbacks are called from the last
+worker thread, for example to start bgeometry.exe after textures are built.
+The process limit is shared by all schedulers, so overlapping exports don't
+run more tools at once than allowed.
+
+Does not use bpy, callbacks must not touch Blender data.
+"""
+
+import heapq
+import subprocess
+import threading
+import time
+
+
+class ToolSlots:
+    """Number of tool processes running at once, over all schedulers"""
+    def __init__(self, limit=4):
+        self.limit = limit
+        self.running = 0
+        self.condition = threading.Condition()
+
+    def set_limit(self, limit):
+        with self.condition:
+            self.limit = max(1, limit)
+            self.condition.notify_all()
+
+    def acquire(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.running < self.limit)
+            self.running += 1
+
+    def release(self):
+        with self.condition:
+            self.running -= 1
+            self.condition.notify()
+
+tool_slots = ToolSlots()
+
+
+class BuildJob:
+    """One tool run and its result"""
+    def __init__(self, key, args, priority, on_finish=None):
+        self.key = key
+        self.args = args
+        self.priority = priority
+        self.on_finish = on_finish
+        self.returncode = None # None while queued or running
+        self.output = ''
+        self.seconds = 0.0
+
+    @property
+    def failed(self):
+        return self.returncode not in (None, 0)
+
+    def run(self):
+        start = time.time()
+        try:
+            proc = subprocess.run(self.args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            self.returncode = proc.returncode
+            self.output = proc.stdout.decode('utf-8', 'replace')
+        except OSError as e: # Tool or wine not found
+            self.returncode = -1
+            self.output = str(e)
+        self.seconds = time.time() - start
+        if self.on_finish is not None:
+            self.on_finish(self)
+
+
+class JobScheduler:
+    """Queue of build jobs run by at most max_workers threads"""
+    def __init__(self, name, max_workers=4):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        tool_slots.set_limit(self.max_workers) # Newest setting applies to all running schedulers
+        self.condition = threading.Condition()
+        self.queue = [] # Heap of (Priority, Order added, Job)
+        self.keys = set()
+        self.jobs = []
+        self.workers = 0
+        self.closed = False
+        self.callbacks = []
+        self.start_time = time.time()
+
+    def add(self, key, args, priority=0, on_finish=None):
+        """Queue tool run. Returns False if job with same key was already added.
+        on_finish(job) is called from worker thread after the tool has exited"""
+        with self.condition:
+            if key in self.keys or self.closed:
+                return False
+            self.keys.add(key)
+            job = BuildJob(key, args, priority, on_finish)
+            self.jobs.append(job)
+            heapq.heappush(self.queue, (priority, len(self.jobs), job))
+            if self.workers < self.max_workers:
+                self.workers += 1
+                threading.Thread(target=self.work, daemon=True).start()
+        return True
+
+    def work(self):
+        while True:
+            with self.condition:
+                if not self.queue:
+                    self.workers -= 1
+                    callbacks = self.take_callbacks()
+                    break
+                job = heapq.heappop(self.queue)[2]
+            tool_slots.acquire()
+            try:
+                job.run()
+            finally:
+                tool_slots.release()
+        for callback in callbacks:
+            callback(self)
+
+    def take_callbacks(self):
+        """Callbacks to run when everything is done. Called with condition held"""
+        if not (self.closed and self.workers == 0 and not self.queue):
+            return []
+        self.condition.notify_all()
+        callbacks, self.callbacks = self.callbacks, []
+        return callbacks
+
+    def close(self, callback=None):
+        """No more jobs will be added. Callback(scheduler) is called once all jobs are finished"""
+        with self.condition:
+            self.closed = True
+            if callback is not None:
+                self.callbacks.append(callback)
+            callbacks = self.take_callbacks()
+        for callback in callbacks: # Nothing was running
+            callback(self)
+
+    @property
+    def done(self):
+        with self.condition:
+            return self.closed and self.workers == 0 and not self.queue
+
+    def wait(self, timeout=None):
+        """Block until closed and all jobs are finished"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.closed and self.workers == 0 and not self.queue, timeout)
+
+    def report(self):
+        """Summary of finished jobs, output of failed ones included"""
+        with self.condition:
+            jobs = list(self.jobs)
+        failed = [job for job in jobs if job.failed]
+        lines = ['%s: %d built, %d failed in %.1f sec.' % (self.name, len(jobs) - len(failed), len(failed), time.time() - self.start_time)]
+        for job in failed:
+            lines.append('  %s failed (%d):' % (job.key, job.returncode))
+            lines += ['    ' + line for line in job.output.strip().splitlines()]
+        return '\n'.join(lines)
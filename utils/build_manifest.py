@@ -0,0 +1,97 @@
+"""Texture build manifest
+
+Remembers content hash of every texture converted by bimage.exe, the options
+used and the hash of the resulting .bmap. A texture is rebuilt only when one
+of them changes, touching a file or checking it out again does not trigger a
+build. Hashes are reused while file size and modification time stay the same.
+
+Also answers whether a texture would replace a stock .bmap of the Wreckfest
+install. Each path is checked once per export and is not stored in the json.
+
+Does not use bpy.
+"""
+
+import os
+import json
+import threading
+
+from .fileio import file_hash, read_json, write_json
+
+
+class BuildManifest:
+    """Converted textures stored as json. Thread safe"""
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.data = {'builds': {}, 'hashes': {}}
+        self.data.update(read_json(filepath, {})) # Empty if no manifest yet or broken manifest
+        self.dirty = self.data.pop('stock', None) is not None # Drop game file index of older manifests
+        self.stock = {} # Dictionary: [Lower case data/.. path : Exists in Wreckfest install]
+
+    @staticmethod
+    def key(path):
+        return os.path.normcase(os.path.abspath(path)).replace('\\', '/')
+
+    def content_hash(self, path):
+        """Hash of file, None if file does not exist"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = self.key(path)
+        with self.lock:
+            cached = self.data['hashes'].get(key)
+        if cached and cached['size'] == st.st_size and cached['mtime'] == st.st_mtime:
+            return cached['hash']
+        digest = file_hash(path)
+        with self.lock:
+            self.data['hashes'][key] = {'hash': digest, 'size': st.st_size, 'mtime': st.st_mtime}
+            self.dirty = True
+        return digest
+
+    def needs_build(self, source, output, options):
+        """Check if output is missing or was built from different source or options"""
+        with self.lock:
+            build = self.data['builds'].get(self.key(output))
+        if build is None:
+            # Not built with the manifest yet, trust .bmap newer than source
+            try:
+                if os.path.getmtime(output) >= os.path.getmtime(source):
+                    self.record(source, output, options)
+                    return False
+            except OSError:
+                pass
+            return True
+        return (build['options'] != list(options) or
+            build['source'] != self.content_hash(source) or
+            build['output'] != self.content_hash(output))
+
+    def record(self, source, output, options):
+        """Store hashes of successful build"""
+        build = {'source': self.content_hash(source), 'output': self.content_hash(output), 'options': list(options)}
+        with self.lock:
+            self.data['builds'][self.key(output)] = build
+            self.dirty = True
+
+    def is_stock(self, wf_path, relative_path):
+        """Check if data/.. path exists in Wreckfest install. False when game path is not set"""
+        if not wf_path:
+            return False
+        key = relative_path.lower()
+        with self.lock:
+            found = self.stock.get(key)
+        if found is None:
+            found = os.path.isfile(os.path.join(wf_path, relative_path))
+            with self.lock:
+                self.stock[key] = found
+        return found
+
+    def save(self):
+        """Write manifest to disk if changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps(self.data, indent=1, sort_keys=True)
+            self.dirty = False
+        write_json(self.filepath, data)
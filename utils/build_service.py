@@ -0,0 +1,123 @@
+"""Background build service
+
+Runs bgeometry.exe builds in background worker threads. Builds are
+identified by their output file, and the same file is never built by two
+workers at once. Exporting the same file again while its build is still
+waiting replaces the waiting build, so only the newest export is built.
+A build can wait for other jobs first, like textures it uses.
+
+Output of every build is captured together with exit code and time taken.
+status() gives one line summary for the UI.
+
+Does not use bpy, callbacks must not touch Blender data.
+"""
+
+import os
+import collections
+import subprocess
+import threading
+import time
+
+
+class BuildResult:
+    """Finished build"""
+    def __init__(self, key, returncode, output, seconds):
+        self.key = key
+        self.returncode = returncode
+        self.output = output
+        self.seconds = seconds
+
+    @property
+    def failed(self):
+        return self.returncode != 0
+
+    def summary(self):
+        name = os.path.basename(self.key)
+        if self.failed:
+            return '%s failed (exit code %d) in %.1f sec.' % (name, self.returncode, self.seconds)
+        return '%s built in %.1f sec.' % (name, self.seconds)
+
+
+class BuildService:
+    """Queue of builds, newer build of same output supersedes waiting one"""
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.pending = collections.OrderedDict() # Dictionary: [Output path : (Args, Wait for, On finish)]
+        self.running = {} # Dictionary: [Output path : Waiting for dependencies]
+        self.workers = 0
+        self.last = None # BuildResult of latest finished build
+
+    def submit(self, key, args, wait_for=None, on_finish=None):
+        """Queue build. wait_for has wait() called before build starts, on_finish(BuildResult) called after"""
+        with self.lock:
+            if key in self.pending:
+                del self.pending[key] # Move to the end, waits for its new dependencies
+            self.pending[key] = (args, wait_for, on_finish)
+            if self.workers < max(1, self.max_workers):
+                self.workers += 1
+                threading.Thread(target=self.work, daemon=True).start()
+
+    def work(self):
+        while True:
+            with self.lock:
+                # Oldest build whose output is not being built by other worker
+                key = next((key for key in self.pending if key not in self.running), None)
+                if key is None:
+                    self.workers -= 1 # Worker building the same output picks it up later
+                    return
+                args, wait_for, on_finish = self.pending.pop(key)
+                self.running[key] = wait_for is not None
+            if wait_for is not None:
+                wait_for.wait()
+            with self.lock:
+                self.running[key] = False
+                if key in self.pending: # Exported again while waiting, build the newer one instead
+                    del self.running[key]
+                    continue
+            result = self.run(key, args)
+            with self.lock:
+                del self.running[key]
+                self.last = result
+            if on_finish is not None:
+                on_finish(result)
+
+    @staticmethod
+    def run(key, args):
+        start = time.time()
+        try:
+            proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            returncode = proc.returncode
+            output = proc.stdout.decode('utf-8', 'replace')
+        except OSError as e: # Tool or wine not found
+            returncode = -1
+            output = str(e)
+        return BuildResult(key, returncode, output, time.time() - start)
+
+    @property
+    def busy(self):
+        with self.lock:
+            return bool(self.running) or bool(self.pending)
+
+    def status(self):
+        """One line status for UI, empty before first build"""
+        with self.lock:
+            if len(self.running) > 1:
+                text = 'Building %d files ...' % len(self.running)
+                if self.pending:
+                    text += ' (%d queued)' % len(self.pending)
+                return text
+            if self.running:
+                key, waiting = next(iter(self.running.items()))
+                text = '%s %s ...' % ('Waiting to build' if waiting else 'Building', os.path.basename(key))
+                if self.pending:
+                    text += ' (%d queued)' % len(self.pending)
+                return text
+            if self.last is not None:
+                return self.last.summary()
+        return ''
+
+    def clear(self):
+        """Drop waiting builds, running build is let to finish"""
+        with self.lock:
+            self.pending.clear()
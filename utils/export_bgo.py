@@ -13,12 +13,21 @@ import time
 import struct
 import subprocess
 import sys
+import collections
+import concurrent.futures
 import bpy
 import bmesh
 import math
 import mathutils
+import numpy as np
 from bpy_extras.io_utils import ExportHelper
 from bpy_extras import anim_utils
+from bpy.app.handlers import persistent
+from . import bgo_writer
+from .bgo_writer import BgoWriter
+from .build_jobs import JobScheduler
+from .build_manifest import BuildManifest
+from .build_service import BuildService
 
 
 wf_custom_data = {
@@ -78,6 +87,213 @@ bpy.types.Scene.wftb_bgo_export_path = bpy.props.StringProperty(
 )
 
 
+# Exported object with everything written to its HIER entry except matrices and mesh
+ExportObject = collections.namedtuple('ExportObject', 'obj id type parent_id name custom_data xref_path mesh_id')
+
+
+class GmeshCache():
+    """Encoded GMSH data of previous exports. Entries are dropped when depsgraph reports a geometry change"""
+    entries = {} # Dictionary: [Object name : (Fingerprint, Encoded GMSH)]
+
+    @staticmethod
+    def fingerprint(ob, material_ids):
+        """Things that change GMSH data without a geometry update of the object"""
+        mesh = ob.data
+        return (mesh.name_full, len(mesh.vertices), len(mesh.polygons), len(mesh.loops), len(mesh.uv_layers),
+            tuple((md.name, md.type, md.show_viewport) for md in ob.modifiers), tuple(material_ids))
+
+    @classmethod
+    def get(self, ob, fingerprint):
+        entry = self.entries.get(ob.name)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        return None
+
+    @classmethod
+    def set(self, name, fingerprint, encoded):
+        self.entries[name] = (fingerprint, encoded)
+
+    @classmethod
+    def clear(self):
+        self.entries = {}
+
+    @classmethod
+    def update(self, depsgraph):
+        """Forget objects and meshes with changed geometry"""
+        if not self.entries:
+            return
+        for update in depsgraph.updates:
+            if not update.is_updated_geometry:
+                continue
+            if isinstance(update.id, bpy.types.Object):
+                self.entries.pop(update.id.original.name, None)
+            elif isinstance(update.id, bpy.types.Mesh): # Mesh may be shared by many objects
+                mesh_name = update.id.original.name_full
+                for name in [name for name, entry in self.entries.items() if entry[0][0] == mesh_name]:
+                    del self.entries[name]
+
+
+@persistent
+def gmesh_cache_update(scene, depsgraph=None):
+    if depsgraph is not None:
+        GmeshCache.update(depsgraph)
+
+@persistent
+def gmesh_cache_clear(*args):
+    GmeshCache.clear()
+
+build_service = BuildService() # bgeometry.exe builds of all exports
+
+def redraw_build_status():
+    """Keep build status in Export panel up to date while building"""
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+    if build_service.busy:
+        return 0.5
+    return None
+
+class ExportWatch():
+    """Export again once scene has been quiet for a while after changes"""
+    enabled = False
+    exporting = False
+    dirty = set() # Names of changed objects and data
+    last_change = 0.0
+    ignore_until = 0.0 # Updates caused by export itself arrive after it, e.g. from frame_set
+    saved = False
+    QUIET = 1.5 # Seconds without changes before exporting
+    INTERVAL = 0.5
+
+    @classmethod
+    def update(self, depsgraph):
+        if not self.enabled or self.exporting or time.time() < self.ignore_until:
+            return
+        for update in depsgraph.updates:
+            data = update.id.original
+            if isinstance(data, (bpy.types.Object, bpy.types.Mesh)):
+                if not (update.is_updated_transform or update.is_updated_geometry):
+                    continue # Selection changes etc.
+                if isinstance(data, bpy.types.Object) and data.type not in ('MESH', 'EMPTY'):
+                    continue
+            if isinstance(data, (bpy.types.Object, bpy.types.Mesh, bpy.types.Material, bpy.types.Collection)):
+                self.dirty.add(data.name_full)
+                self.last_change = time.time()
+
+    @classmethod
+    def tick(self):
+        """Timer, export when changes have settled"""
+        if not self.enabled:
+            return None
+        if not self.dirty:
+            return self.INTERVAL
+        if not self.saved and time.time() - self.last_change < self.QUIET:
+            return self.INTERVAL
+        if build_service.busy: # Backpressure, let running build finish before next export
+            return self.INTERVAL
+        if bpy.context.mode != 'OBJECT' or not bpy.context.scene.get('wftb_bgo_export_path'):
+            return self.INTERVAL # Export would leave edit mode
+        print("Auto export, %d changed: %s" % (len(self.dirty), ', '.join(sorted(self.dirty)[:5])))
+        self.dirty = set()
+        self.saved = False
+        self.exporting = True
+        try:
+            window = bpy.context.window_manager.windows[0]
+            if hasattr(bpy.context, 'temp_override'):
+                with bpy.context.temp_override(window=window, screen=window.screen):
+                    bpy.ops.wftb.export_bgo()
+            else:
+                bpy.ops.wftb.export_bgo({'window': window, 'screen': window.screen})
+        except Exception as e:
+            print("Auto export failed:", e)
+        finally:
+            self.exporting = False
+            self.ignore_until = time.time() + self.INTERVAL
+        return self.INTERVAL
+
+    @classmethod
+    def reset(self):
+        """Forget changes, loading a file is not a change to export"""
+        self.dirty = set()
+        self.saved = False
+        self.ignore_until = time.time() + self.INTERVAL
+
+    @classmethod
+    def start(self):
+        self.enabled = True
+        self.dirty = set()
+        if not bpy.app.timers.is_registered(export_watch_tick): # Persistent, keeps watching after file load
+            bpy.app.timers.register(export_watch_tick, first_interval=self.INTERVAL, persistent=True)
+
+    @classmethod
+    def stop(self):
+        self.enabled = False
+        self.dirty = set()
+        if bpy.app.timers.is_registered(export_watch_tick):
+            bpy.app.timers.unregister(export_watch_tick)
+
+
+@persistent
+def export_watch_update(scene, depsgraph=None):
+    if depsgraph is not None:
+        ExportWatch.update(depsgraph)
+
+@persistent
+def export_watch_save(*args):
+    ExportWatch.saved = True # Export pending changes without waiting
+
+@persistent
+def export_watch_load(*args):
+    ExportWatch.reset()
+
+def export_watch_tick():
+    return ExportWatch.tick()
+
+def register_handlers():
+    bpy.app.handlers.depsgraph_update_post.append(gmesh_cache_update)
+    bpy.app.handlers.depsgraph_update_post.append(export_watch_update)
+    bpy.app.handlers.save_post.append(export_watch_save)
+    bpy.app.handlers.load_post.append(export_watch_load)
+    bpy.app.handlers.frame_change_post.append(gmesh_cache_update) # Animated modifiers and shape keys
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(gmesh_cache_clear)
+
+def unregister_handlers():
+    for handlers in (bpy.app.handlers.depsgraph_update_post, bpy.app.handlers.frame_change_post):
+        if gmesh_cache_update in handlers:
+            handlers.remove(gmesh_cache_update)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if gmesh_cache_clear in handlers:
+            handlers.remove(gmesh_cache_clear)
+    if export_watch_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(export_watch_update)
+    if export_watch_save in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.remove(export_watch_save)
+    if export_watch_load in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(export_watch_load)
+    ExportWatch.stop()
+    GmeshCache.clear()
+    build_service.clear()
+    if bpy.app.timers.is_registered(redraw_build_status):
+        bpy.app.timers.unregister(redraw_build_status)
+
+
+class WFTB_OP_export_watch(bpy.types.Operator):
+    """Export and build automatically after changes in the scene"""
+    bl_idname = "wftb.export_watch"
+    bl_label = "Auto Export"
+    bl_description = "Toggle automatic Direct Export when the scene has not changed for a moment"
+
+    def execute(self, context):
+        if ExportWatch.enabled:
+            ExportWatch.stop()
+            self.report({'INFO'}, "Auto export stopped")
+        else:
+            ExportWatch.start()
+            self.report({'INFO'}, "Auto export started")
+        return {'FINISHED'}
+
+
 class WFTB_OP_export_bgo_with_dialog(bpy.types.Operator, ExportHelper):
     """Export the visible scene to a BGO File"""
     bl_idname = "wftb.export_bgo_with_dialog"
@@ -116,8 +332,13 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         self.export_path = bpy.context.scene.get('wftb_bgo_export_path')
         self.output = None
         self.errors = None
-        self.done_bmaps = [] 
+        self.done_bmaps = set()
         self.prefs = bpy.context.preferences.addons["wreckfest_toolbox"].preferences
+        self.texture_jobs = JobScheduler('Textures', self.prefs.build_jobs)
+        self.build_manifest = None
+        if self.prefs.build_bmap: # Hashes of built textures, shared by all projects
+            config = bpy.utils.user_resource('CONFIG', path='wreckfest_toolbox')
+            self.build_manifest = BuildManifest(os.path.join(config, 'texture_builds.json'))
 
         if not self.export_path:
             return {'CANCELLED'}
@@ -134,29 +355,79 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         wm = bpy.context.window_manager
         total = 100
         wm.progress_begin(0, total)
-        with open(self.export_path, 'wb') as file:
-            file.write(struct.pack('I', 0)) # File length
-            file.write(bytes('MAIN', 'utf-8'))
-            print("Write Info ...")
-            self.write_info(file)
-            print("Write Materials ...")
-            self.write_materials(file)
-            print("Write Objects ...")
-            self.write_objects(file)
-            self.write_filelen(0, file) # Rewrite file length at the beginning
+
+        # Subscene collections are written to their own files and referenced with #xref
+        subscenes = self.get_subscenes() if self.prefs.split_subscenes else []
+        skipped = set()
+        xrefs = []
+        changed_subscenes = []
+        for collection, subscene_path in subscenes:
+            names = {obj.name_full for obj in collection.all_objects}
+            skipped.update(names)
+            objects = [obj for obj in bpy.context.view_layer.objects if obj.name_full in names]
+            print("Write Subscene %s ..." % collection.name)
+            if self.write_bgo(subscene_path, self.get_exportables(objects)) or not os.path.isfile(subscene_path[:-5]+'.scne'):
+                changed_subscenes.append(subscene_path)
+            xrefs.append((os.path.basename(subscene_path)[:-5] + '#xref', self.get_relative_texpath(subscene_path)[:-5] + '.scn'))
+        if subscenes:
+            print("Subscenes changed: %d / %d" % (len(changed_subscenes), len(subscenes)))
+        self.write_bgo(self.export_path, self.get_exportables(skipped=skipped), xrefs)
 
         self.show_message('export done in %.4f sec.' % (time.time() - time1))
         print("----------------------------------------")
+        build_manifest = self.build_manifest
+        if build_manifest is not None:
+            self.texture_jobs.close(lambda texture_jobs: build_manifest.save())
+        self.texture_jobs.close(self.report_textures)
         if self.prefs.build_after_export:
+            for subscene_path in changed_subscenes:
+                self.build_and_notify(subscene_path, subscene=True)
             self.build_and_notify()
 
         return {'FINISHED'}
 
+    def write_bgo(self, filepath, exportables, xrefs=()):
+        """Write objects to .bgo3 file. Returns False if file was already up to date"""
+        file = BgoWriter() # Whole file is built in memory and saved at once
+        file.write(struct.pack('I', 0)) # File length
+        file.write(bytes('MAIN', 'utf-8'))
+        print("Write Info ...")
+        self.write_info(file)
+        exportables = self.get_export_table(exportables, xrefs)
+        self.materials = self.get_export_materials(exportables)
+        self.material_ids = {mat.name_full: i for i, mat in enumerate(self.materials)}
+        print("Write Materials ...")
+        self.write_materials(file, exportables)
+        print("Write Objects ...")
+        self.write_objects(file, exportables)
+        self.write_filelen(0, file) # Rewrite file length at the beginning
+        if file.matches(filepath):
+            return False
+        file.save(filepath)
+        return True
+
+    def get_subscenes(self):
+        """Top level collections with #subscene in name and path of their .bgo3 files"""
+        if self.get_relative_texpath(os.path.abspath(self.export_path)) is None:
+            print("Subscenes can be split only when exporting under /data/ folder")
+            return []
+        subscenes = []
+        for collection in bpy.context.scene.collection.children:
+            if "#subscene" in collection.name and not collection.name.endswith("#exclude"):
+                name = collection.name.replace("#subscene", "").strip()
+                name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+                subscene_path = os.path.abspath(self.export_path)[:-5] + '_' + name + '.bgo3'
+                subscenes.append((collection, subscene_path))
+        return subscenes
+
     def show_message(self, message="", message_type='INFO'):
-        def draw(self, context):
-            self.layout.label(text=message)
+        if ExportWatch.exporting: # No popup after every auto export, status bar only
+            self.report({message_type}, message)
+        else:
+            def draw(self, context):
+                self.layout.label(text=message)
 
-        bpy.context.window_manager.popup_menu(draw, title='BGO Exporter', icon=message_type)
+            bpy.context.window_manager.popup_menu(draw, title='BGO Exporter', icon=message_type)
         print(message_type, " : ", message)
 
     @staticmethod
@@ -175,6 +446,76 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         ob.scale = mathutils.Vector(new_scl)
         bpy.context.view_layer.update()
 
+    @staticmethod
+    def matrices_close(a, b, tolerance=1e-4):
+        return all(abs(a[r][c] - b[r][c]) <= tolerance * (1 + abs(b[r][c])) for r in range(4) for c in range(4))
+
+    @staticmethod
+    def flipped_basis(ob):
+        """matrix_basis as it would be after flip_axes, without touching the object"""
+        scale = mathutils.Vector([s * d for s, d in zip(ob.scale, ob.delta_scale)])
+        if 0 in scale:
+            return None
+        flipped_scale = mathutils.Vector((scale[0], scale[2], scale[1]))
+        rot = mathutils.Matrix.Identity(3)
+        flipped_rot = mathutils.Matrix.Identity(3)
+        if ob.rotation_mode not in ('QUATERNION', 'AXIS_ANGLE'): # flip_axes only changes euler rotation
+            euler = ob.rotation_euler
+            rot = euler.to_matrix()
+            flipped_rot = mathutils.Euler((-euler[0], -euler[2], -euler[1]), ob.rotation_mode).to_matrix()
+        # Basis is Location @ Delta rotation @ Rotation @ Scale, swap the last two
+        correction = (mathutils.Matrix.Diagonal(scale).inverted() @ rot.transposed() @
+            flipped_rot @ mathutils.Matrix.Diagonal(flipped_scale))
+        return ob.matrix_basis @ correction.to_4x4()
+
+    @staticmethod
+    def apply_pivot(world, pivot):
+        """Pivot constraint: rotate owner around target location, same math as Blender"""
+        world = world.copy()
+        rot = world.to_3x3().normalized()
+        point = pivot.target.matrix_world.translation + pivot.offset
+        axis, angle = rot.to_quaternion().to_axis_angle()
+        if angle:
+            point -= (point - world.translation).project(axis)
+        world.translation = point + rot @ (world.translation - point)
+        return world
+
+    @staticmethod
+    def flipped_local_matrix(ob, pivot=None):
+        """matrix_local of object as it would be after flip_axes. Pivot constraint of owner is evaluated in Python.
+        Returns None for setups that can't be reproduced, those fall back to flip_axes"""
+        constraints = [cs for cs in ob.constraints if not cs.mute]
+        if constraints != ([pivot] if pivot else []):
+            return None
+        basis = WFTB_OP_export_bgo.flipped_basis(ob)
+        if basis is None:
+            return None
+        if pivot is None:
+            if ob.parent is not None:
+                basis = ob.matrix_parent_inverse @ basis
+            return basis
+        # Owner of pivot constraint
+        target = pivot.target
+        if (target is None or pivot.subtarget or pivot.influence != 1 or pivot.rotation_range != 'ALWAYS_ACTIVE' or
+                pivot.owner_space != 'WORLD' or pivot.target_space != 'WORLD'):
+            return None
+        parent_world = mathutils.Matrix.Identity(4)
+        if ob.parent is not None:
+            if ob.parent_type != 'OBJECT':
+                return None
+            parent_world = ob.parent.matrix_world @ ob.matrix_parent_inverse
+        while target is not None: # Flipping owner would move target parented to it
+            if target == ob:
+                return None
+            target = target.parent
+        # Check that constraint math gives current transform before trusting flipped result
+        if not WFTB_OP_export_bgo.matrices_close(WFTB_OP_export_bgo.apply_pivot(parent_world @ ob.matrix_basis, pivot), ob.matrix_world):
+            return None
+        world = WFTB_OP_export_bgo.apply_pivot(parent_world @ basis, pivot)
+        if ob.parent is not None:
+            return ob.parent.matrix_world.inverted() @ world
+        return world
+
     @staticmethod
     def get_relative_texpath(absolute_path):
         splts = absolute_path.replace('\\', '/').lower().split('/')
@@ -205,34 +546,98 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         return mat_loc @ mat_rot @ mat_sca
 
     @staticmethod
-    def get_material_id_list(obj):
-        # Create dict of all scene material names and indices, {"Name": id}
-        scene_mat_id = {mat.name: i for i, mat in enumerate(bpy.data.materials)}
-        # Create list of all object's material id (global id)
+    def get_export_materials(exportables):
+        """Materials used by exported meshes, in the order of bpy.data.materials"""
+        used = set()
+        for entry in exportables:
+            if entry.type == 'OBJM':
+                used.update(mat.name_full for mat in entry.obj.data.materials if mat is not None)
+        return [mat for mat in bpy.data.materials if mat.name_full in used]
+
+    def get_material_id_list(self, obj):
+        # Create list of all object's material id (global id in MLST)
         indices = []
         for mat in obj.data.materials:
             if mat is not None:
-                indices += float(scene_mat_id[mat.name]),
+                indices += float(self.material_ids[mat.name_full]),
             else: # Empty material slots reset to 0
                 indices += float(0),
         return indices
 
     @staticmethod
-    def get_exportables():
-        """Get all the objects in the scene"""
+    def get_excluded_objects(collection, excluded=None):
+        """Names of objects in #exclude collections, nested collections included"""
+        if excluded is None:
+            excluded = set()
+        for child in collection.children:
+            if child.name.endswith("#exclude"):
+                excluded.update(obj.name_full for obj in child.all_objects)
+            else:
+                WFTB_OP_export_bgo.get_excluded_objects(child, excluded)
+        return excluded
+
+    @staticmethod
+    def get_exportables(objects=None, skipped=()):
+        """Get all the objects in the scene, or exportable ones of given objects"""
+        excluded = WFTB_OP_export_bgo.get_excluded_objects(bpy.context.scene.collection)
         exportables = []
-        # get objects in visible collections
-        for obj in bpy.context.view_layer.objects:
+        if objects is None: # get objects in visible collections
+            objects = bpy.context.view_layer.objects
+        for obj in objects:
             if (obj.type == 'MESH' or obj.type == 'EMPTY') and ('PivotObject' not in obj) and (obj.hide_viewport == False):
-                is_exportable = True
-                for collection in obj.users_collection:
-                    if collection.name.endswith("#exclude"):
-                        is_exportable = False
-                if is_exportable:
+                if obj.name_full not in excluded and obj.name_full not in skipped:
                     exportables.append(obj)
 
         return exportables
 
+    def get_export_table(self, exportables, xrefs=()):
+        """Exported objects with ids, types and strings written to HIER.
+        xrefs are (Name, Path) of subscenes referenced without an object"""
+        table = []
+        objects_id_dictionary = {}
+        for obj in exportables:
+            object_type = self.find_object_type(obj)
+            if object_type == '':
+                continue
+            objects_id_dictionary[obj.name] = len(table) + 1
+            table.append((obj, object_type))
+
+        mesh_id = -1
+        for i, (obj, object_type) in enumerate(table):
+            if object_type == 'OBJM':
+                mesh_id += 1
+            if obj.name.strip().startswith("#xref"):  # Rewriting names of Xref Subscene
+                name = self.fake_xref_name(obj.name)
+            else:
+                name = obj.name
+            xref_path = None
+            if object_type == 'OBJX':
+                if obj.name.strip().startswith("#xref"): # Xref Subscene (Unofficial)
+                    xref_path = self.find_xref_path(obj) # Path with 3 character extension
+                else:  # File > link Subscene
+                    apth = os.path.abspath(bpy.path.abspath(obj.data.library.filepath))
+                    xref_path = str(self.get_relative_texpath(apth.replace(".blend", ".ble")))
+            parent_id = 0
+            if obj.parent is not None:
+                parent_id = objects_id_dictionary.get(obj.parent.name, 0) # Parent not exported, write as root
+                if parent_id == 0:
+                    if self.object_has_pivot(obj) is not None:
+                        print('Warning: %s: Parent %s is not in this file, pivot object is written relative to origin' % (obj.name, obj.parent.name))
+                    else:
+                        print('%s: Parent %s is not in this file, writing world transform' % (obj.name, obj.parent.name))
+            table[i] = ExportObject(obj, i + 1, object_type, parent_id, name,
+                str(self.get_custom_data(obj)).replace('|', '\r\n'), xref_path, mesh_id if object_type == 'OBJM' else None)
+        for name, xref_path in xrefs:
+            table.append(ExportObject(None, len(table) + 1, 'OBJX', 0, name, '', xref_path, None))
+        return table
+
+    @staticmethod
+    def object_matrix(entry):
+        """Matrix written for object. World matrix when parent goes to other file or is not exported"""
+        if entry.parent_id == 0 and entry.obj.parent is not None:
+            return entry.obj.matrix_world
+        return entry.obj.matrix_local
+
     @staticmethod
     def get_undupe_name(name):
         nidx = name.rfind('.')
@@ -263,43 +668,51 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         file.write(struct.pack('ffff', matrix[0][3], matrix[2][3], matrix[1][3], matrix[3][3]))
 
     @staticmethod
-    def write_filelen(offset, file, additional_adding=0):
-        final_filelen = file.tell() - offset + additional_adding
-        file.seek(offset)
-        file.write(struct.pack('I', final_filelen))
-        file.seek(0, 2)
-        return final_filelen
+    def flip_matrices(matrices):
+        """Array of matrices in the layout of write_flipped_matrix, Y and Z swapped"""
+        swap = [0, 2, 1, 3]
+        return matrices[:, swap][:, :, swap].transpose(0, 2, 1)
 
-    @staticmethod
-    def write_cstring(string, file):
-        file.write(bytes(string + '\x00', 'utf-8'))
+    write_filelen = staticmethod(bgo_writer.write_filelen)
+    write_cstring = staticmethod(bgo_writer.write_cstring)
 
     @staticmethod
     def write_color3f(color, file):
         file.write(struct.pack('fff', color[0], color[1], color[2]))
 
-    @staticmethod
-    def create_header(header_name, header_size, file):
-        file.write(struct.pack('I', header_size))
-        file.write(bytes(header_name, 'utf-8'))
-        return file.tell() - 8
+    create_header = staticmethod(bgo_writer.create_header)
 
     def write_info(self, file):
-        info_start_offset = self.create_header('INFO', 0, file)
-        file.write(struct.pack('I', 777))
-        self.write_cstring('BGO', file)
-        my_username = self.prefs.username
-        self.write_cstring(my_username, file)
-        self.write_filelen(info_start_offset, file)
-
-    def write_materials(self, file):
+        bgo_writer.write_info(file, self.prefs.username)
+
+    def write_materials(self, file, exportables=()):
         mlst_start_offset = self.create_header('MLST', 0, file)
-        file.write(struct.pack('I', len(bpy.data.materials)))
-        for mtl in bpy.data.materials:
+        # Triangles always point to a material, meshes without any get a default one
+        default = not self.materials and any(entry.type == 'OBJM' for entry in exportables)
+        file.write(struct.pack('I', len(self.materials) + default))
+        for mtl in self.materials:
             self.write_material_individual(mtl, file)
+        if default:
+            self.write_default_material(file)
 
         self.write_filelen(mlst_start_offset, file)
 
+    def write_default_material(self, file):
+        """Write grey material without textures, Blender defaults"""
+        matc_start_offset = self.create_header('MATC', 0, file)
+        file.write(bytes('\x00' * 32, 'utf-8'))
+        self.write_color3f((0.8, 0.8, 0.8), file)
+        self.write_color3f((0.8, 0.8, 0.8), file)
+        self.write_color3f((1.0, 1.0, 1.0), file)
+        file.write(struct.pack('fff', 0.5, 0.5, 1.0)) # Roughness, specular intensity, alpha
+        file.write(struct.pack('I', 2))
+        file.write(bytes('\x00\x00\x00\x00', 'utf-8'))
+        file.write(struct.pack('I', 0))
+        file.write(bytes('\x00\x00\x00\x00', 'utf-8'))
+        self.write_cstring('default', file)
+        file.write(struct.pack('I', 0)) # No textures
+        self.write_filelen(matc_start_offset, file)
+
     def write_material_individual(self, mat, file):
         """Write a material in the file"""
         matc_start_offset = self.create_header('MATC', 0, file)
@@ -417,31 +830,33 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         for tn in tex_nodes:
             self.write_texture_node_individual(tn["node"], tn["id"], file)
 
-    def build_bmap_file(self,filepath):
-        '''Convert .tga, .png texture to .bmap with bgeometry.exe'''
+    def build_bmap_file(self, filepath, priority=0):
+        '''Queue .tga, .png texture conversion to .bmap with bimage.exe'''
         filepath = filepath.replace('\\', '/') # To linux paths
         if filepath[-4:].lower() in ['.png','.tga'] and filepath not in self.done_bmaps: 
-            self.done_bmaps.append(filepath)  # Progress each file only once.
+            self.done_bmaps.add(filepath)  # Progress each file only once.
             if '/data/' in filepath: # Check that file is under /data/ folder
                 bmap_filepath = filepath[:-4] + '.bmap'
-                try: tga_lastmodified = os.path.getmtime(filepath) # Check that .tga file exists, get last modified time
-                except: return  # .tga file does not exist
-                try: bmap_lastmodified = os.path.getmtime(bmap_filepath) # Try check .bmap last modified time
-                except: bmap_lastmodified = 0  # .bmap file does not exist
-                if tga_lastmodified > bmap_lastmodified: # Check that .tga is more recent than .bmap
-                    relative_path = '/data/' + bmap_filepath.rsplit('/data/',maxsplit=1)[-1]
-                    if not os.path.isfile(self.prefs.wf_path + relative_path): # Check that matching name .bmap does not exist in wreckfest install.
-                        print(os.path.basename(filepath),"conversion to .bmap with bimage.exe ...")
-                        bimage = self.prefs.wf_path + R"\tools\bimage.exe"
-                        args = [bimage, '-auto', '-input', filepath, '-output', bmap_filepath]
-                        if sys.platform != 'win32':  args = ['wine'] + args # In Linux run .exe with wine
-                        try: subprocess.Popen(args) # Run bimage in background
-                        except: print("Failed to run bimage.exe")
-
-                        # Try build alternative textures
-                        if '/vehicle/' in filepath and filepath.lower()[-7:-3] == '_c5.':
-                            for ext in 'c5','n','s','ao_c','damaged_c5','damaged_n','damaged_s':
-                                self.build_bmap_file(filepath[:-6] + ext + filepath[-4:])
+                if not os.path.isfile(filepath): return  # .tga file does not exist
+                relative_path = 'data/' + bmap_filepath.rsplit('/data/',maxsplit=1)[-1]
+                if self.build_manifest.is_stock(self.prefs.wf_path, relative_path):
+                    return # Matching name .bmap exists in wreckfest install
+                options = ['-auto']
+                if self.build_manifest.needs_build(filepath, bmap_filepath, options): # Content or options changed
+                    print(os.path.basename(filepath),"conversion to .bmap with bimage.exe ...")
+                    bimage = self.prefs.wf_path + R"\tools\bimage.exe"
+                    args = [bimage] + options + ['-input', filepath, '-output', bmap_filepath]
+                    if sys.platform != 'win32':  args = ['wine'] + args # In Linux run .exe with wine
+                    manifest = self.build_manifest
+                    def on_finish(job, source=filepath, output=bmap_filepath):
+                        if not job.failed:
+                            manifest.record(source, output, options)
+                    self.texture_jobs.add(bmap_filepath, args, priority, on_finish) # Run bimage in background
+
+                    # Try build alternative textures, after textures used in materials
+                    if '/vehicle/' in filepath and filepath.lower()[-7:-3] == '_c5.':
+                        for ext in 'c5','n','s','ao_c','damaged_c5','damaged_n','damaged_s':
+                            self.build_bmap_file(filepath[:-6] + ext + filepath[-4:], 1)
 
     # This method take a  TEX Node in param, and it's slot_id from Princ BSDF to WF dict
     def write_texture_node_individual(self, node, slotid, file):
@@ -502,50 +917,99 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         self.write_cstring(texture_path, file)
         self.write_filelen(texc_start_offset, file)
 
-    def write_gmesh(self, ob, file):
-        ob_material_id_list = self.get_material_id_list(ob)
-        # print('writing mesh for ' + ob.name)
-        gmesh_start_offset = self.create_header('GMSH', 0, file)
-        bm = bmesh.new()
-        # TODO : See to_mesh to use preserve all data layer
-        # temp_mesh = ob.to_mesh()
-        # bm.from_mesh(temp_mesh)
+    def extract_gmesh(self, ob, ob_material_id_list=None):
+        """Evaluated mesh of object as NumPy arrays. Needs main thread"""
+        if ob_material_id_list is None:
+            ob_material_id_list = self.get_material_id_list(ob)
         # TODO: Apply modifiers based on: self.prefs.apply_modifiers
         depsgraph = bpy.context.view_layer.depsgraph
-        bm.from_object(object=ob, depsgraph=depsgraph) 
-
-        bm_tris = bm.calc_loop_triangles()
-        uv_layers = len(bm.loops.layers.uv)
-        range_uv_layers = range(uv_layers) # Range outside of loop, faster
-        file.write(struct.pack('II', len(bm_tris), uv_layers))
-        for tri in bm_tris:
-            mat_index = 0
+        ob_eval = ob.evaluated_get(depsgraph)
+        mesh = ob_eval.to_mesh()
+        try:
+            self.triangulate_ngons(mesh)
+            return self.get_gmesh_arrays(mesh, ob_material_id_list)
+        finally:
+            ob_eval.to_mesh_clear()
+
+    def write_gmesh(self, ob, file, encoded=None):
+        """Write GMSH chunk. Encoded data can be prepared earlier with encode_gmesh"""
+        # print('writing mesh for ' + ob.name)
+        if encoded is None:
+            encoded = self.encode_gmesh(self.extract_gmesh(ob))
+        bgo_writer.write_gmesh(file, encoded)
+
+    @staticmethod
+    def triangulate_ngons(mesh):
+        """Triangulate faces with more than 4 corners, MikkTSpace tangents can't be calculated for them.
+        Only for temporary evaluated mesh"""
+        corners = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', corners)
+        if not (corners > 4).any():
+            return
+        bm = bmesh.new()
+        try:
+            bm.from_mesh(mesh)
+            bmesh.ops.triangulate(bm, faces=[face for face in bm.faces if len(face.verts) > 4])
+            bm.to_mesh(mesh)
+        finally:
+            bm.free()
+
+    @staticmethod
+    def get_gmesh_arrays(mesh, material_id_list):
+        """Copy triangulated mesh data into NumPy arrays"""
+        mesh.calc_loop_triangles()
+        tri_count = len(mesh.loop_triangles)
+        tri_loops = np.empty(tri_count * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get('loops', tri_loops)
+        tri_materials = np.empty(tri_count, dtype=np.int32)
+        mesh.loop_triangles.foreach_get('material_index', tri_materials)
+        loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', co)
+        normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('normal', normals)
+        uvs = []
+        for uv_layer in mesh.uv_layers:
+            uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            uv_layer.data.foreach_get('uv', uv)
+            uvs.append(uv.reshape(-1, 2))
+
+        # MikkTSpace tangents for each uv map and split normals
+        tangents = None
+        loop_normals = None
+        if uvs:
             try:
-                mat_index = ob_material_id_list[tri[0].face.material_index] # Local material id to scene material id
-            except Exception:
-                mat_index = 0
-
-            for loop in tri[::-1]:
-                vco = loop.vert.co
-                file.write(struct.pack('ffff', mat_index, vco[0], vco[2], vco[1]))
-                for uvl in range_uv_layers:
-                    normal = loop.vert.normal # Access bpy once, faster
-                    uv_data = loop[bm.loops.layers.uv[uvl]].uv
-                    c1p = normal.cross(mathutils.Vector((0.0, 0.0, 1.0)))
-                    c2p = normal.cross(mathutils.Vector((0.0, 1.0, 0.0)))
-                    loop_tang = c2p
-                    if c1p.length > c2p.length:
-                        loop_tang = c1p
-                    loop_binormal = normal.cross(loop_tang)
-                    file.write(struct.pack('fffffffffff',  # combining struck.pack is faster
-                                           uv_data[0], ((uv_data[1] - 1) * -1),
-                                           normal[0], normal[2], normal[1],
-                                           loop_tang[0], loop_tang[2], loop_tang[1],
-                                           loop_binormal[0], loop_binormal[2], loop_binormal[1]))
-
-        # bpy.data.meshes.remove(temp_mesh) No longer needed
-        bm.free()
-        self.write_filelen(gmesh_start_offset, file, -8)
+                tangents = []
+                for uv_layer in mesh.uv_layers:
+                    mesh.calc_tangents(uvmap=uv_layer.name)
+                    tangent = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+                    mesh.loops.foreach_get('tangent', tangent)
+                    sign = np.empty(len(mesh.loops), dtype=np.float32)
+                    mesh.loops.foreach_get('bitangent_sign', sign)
+                    tangents.append((tangent.reshape(-1, 3), sign))
+                loop_normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+                mesh.loops.foreach_get('normal', loop_normals)
+                loop_normals = loop_normals.reshape(-1, 3)
+                mesh.free_tangents()
+            except RuntimeError as e: # Tangents can't be calculated, use approximation
+                print('Warning: %s: MikkTSpace tangents failed, using approximation: %s' % (mesh.name, e))
+                tangents = None
+                loop_normals = None
+
+        return {
+            'tri_loops': tri_loops,
+            'tri_materials': tri_materials,
+            'loop_verts': loop_verts,
+            'co': co.reshape(-1, 3),
+            'normals': normals.reshape(-1, 3),
+            'uvs': uvs,
+            'tangents': tangents,
+            'loop_normals': loop_normals,
+            'material_ids': np.array(material_id_list, dtype=np.float32),
+        }
+
+    encode_gmesh = staticmethod(bgo_writer.encode_gmesh)
 
     @staticmethod
     def get_keyframes(self,obj):
@@ -568,7 +1032,7 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
 
 
     @staticmethod
-    def write_animations(self, file, exportables, objects_id_dictionary, bake_animation=False):
+    def write_animations(self, file, exportables, bake_animation=False):
         second = 4800 # length of second (3dsMax internal unit)
         fps = round(bpy.context.scene.render.fps / bpy.context.scene.render.fps_base)
         firstFrameTime = round(bpy.context.scene.frame_start / fps * second)
@@ -579,37 +1043,46 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
         file.write(struct.pack('5I', second, firstFrameTime, fps, 0, lastFrameTime)) 
         file.write(struct.pack('8I', 0, 0, 0, 0, 0, 0, 0, 0))
 
-        frame_before = bpy.context.scene.frame_current #backup frame selection
-        for obj in exportables:
-            if obj.animation_data and obj.animation_data.action and obj.animation_data.action.frame_range[1]>0:
-                if self.find_object_type(obj) == 'OBJM':    
-                    anim_offset = self.create_header('ANIM', 0, file)
-                    file.write(struct.pack('I', objects_id_dictionary[obj.name])) #Object ID (reference to mesh)
-                    asmp_offset = self.create_header('ASMP', 0, file)
-
+        # Frames to sample for each animated object
+        animated = [] # List of (ExportObject, List of frames)
+        for entry in exportables:
+            obj = entry.obj
+            if obj is not None and obj.animation_data and obj.animation_data.action and obj.animation_data.action.frame_range[1]>0:
+                if entry.type == 'OBJM':
                     keys = self.get_keyframes(self,obj) # Get every keyframe number
-                    
                     if(bake_animation): # 1 Keyframe every Blender frame
-                        firstFrame = round(keys[0])
-                        lastFrame = round(keys[-1])
-                        file.write(struct.pack('I', lastFrame-firstFrame+1)) #Number of keyframes
-                        for frame in range(firstFrame, lastFrame+1):
-                            bpy.context.scene.frame_set(frame) #move to frame
-                            wfTime = round((frame - bpy.context.scene.frame_start) / fps * second) #time
-                            if(wfTime<0): wfTime = 0 # bugfix for frames before frame_start
-                            file.write(struct.pack('I', wfTime)) 
-                            self.write_flipped_matrix(obj.matrix_local, file) #transform matrix
+                        frames = list(range(round(keys[0]), round(keys[-1])+1))
                     else: # Original keyframe data
-                        file.write(struct.pack('I', len(keys))) #Number of keyframes
-                        for frame in keys:
-                            bpy.context.scene.frame_set(frame=math.floor(frame), subframe=frame%1) #move to frame
-                            wfTime = round((frame - bpy.context.scene.frame_start) / fps * second) #time
-                            if(wfTime<0): wfTime = 0 # bugfix for frames before frame_start
-                            file.write(struct.pack('I', wfTime)) 
-                            self.write_flipped_matrix(obj.matrix_local, file) #transform matrix
-
-                    self.write_filelen(asmp_offset, file, 0)
-                    self.write_filelen(anim_offset, file, 0)
+                        frames = keys
+                    animated.append((entry, frames))
+
+        # Step timeline once over all frames, sample every object animated at that frame
+        frame_before = bpy.context.scene.frame_current #backup frame selection
+        samples = [np.empty((len(frames), 4, 4), dtype=np.float32) for entry, frames in animated]
+        users = {} # Dictionary: [Frame : List of (Animated object index, Sample index)]
+        for i, (entry, frames) in enumerate(animated):
+            for j, frame in enumerate(frames):
+                users.setdefault(frame, []).append((i, j))
+        for frame in sorted(users):
+            bpy.context.scene.frame_set(frame=math.floor(frame), subframe=frame%1) #move to frame
+            for i, j in users[frame]:
+                samples[i][j] = self.object_matrix(animated[i][0])
+
+        # Write ASMP blocks from sampled matrices
+        asmp_dtype = np.dtype([('time', '<u4'), ('matrix', '<f4', (4, 4))])
+        for (entry, frames), matrices in zip(animated, samples):
+            anim_offset = self.create_header('ANIM', 0, file)
+            file.write(struct.pack('I', entry.id)) #Object ID (reference to mesh)
+            asmp_offset = self.create_header('ASMP', 0, file)
+            file.write(struct.pack('I', len(frames))) #Number of keyframes
+            asmp = np.empty(len(frames), dtype=asmp_dtype)
+            for j, frame in enumerate(frames):
+                wfTime = round((frame - bpy.context.scene.frame_start) / fps * second) #time
+                asmp['time'][j] = max(wfTime, 0) # bugfix for frames before frame_start
+            asmp['matrix'] = self.flip_matrices(matrices) #transform matrix
+            file.write(asmp.tobytes())
+            self.write_filelen(asmp_offset, file, 0)
+            self.write_filelen(anim_offset, file, 0)
         self.write_filelen(anfo_offset, file, 0)
         bpy.context.scene.frame_set(frame_before) #restore original frame selection
 
@@ -685,75 +1158,104 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
             return 'OBJD'
         return ''
 
-    def write_objects(self, file):
-        """Get all the objects that are not in a collection with the suffix #exclude"""
+    def write_objects(self, file, exportables):
+        """Write all the objects that are not in a collection with the suffix #exclude"""
         hier_start_offset = self.create_header('HIER', 0, file)
-        exportables = self.get_exportables()
         file.write(struct.pack('I', len(exportables)))
-        objects_id_dictionary = {}
-        objects_id_current = 1
-        objects_id_mesh = -1
-        for obj in exportables:
-            #print('writing object ' + obj.name)
-            object_type = self.find_object_type(obj)
-            if object_type == '':
-                continue
-            if object_type == 'OBJM':
-                objects_id_mesh += 1
-
-            objects_id_dictionary[obj.name] = objects_id_current
-            object_offset = self.create_header(object_type, 0, file)
-            if obj.parent is not None:
-                file.write(struct.pack('I', objects_id_dictionary[obj.parent.name]))
-            else:
-                file.write(struct.pack('I', 0))
-            file.write(struct.pack('I', 0))
-
-            pivot = self.object_has_pivot(obj)
-            if pivot is not None:  # If special pivot constraint used?
-                self.flip_axes(obj)  # slow
-                self.write_matrix(obj.matrix_local, file)
-                # print('using pivot matrix from ' + pivot.target.name + ' for ' + obj.name)
-                self.flip_axes(pivot.target)
-                self.write_matrix(pivot.target.matrix_local, file, obj.location)
-                self.flip_axes(pivot.target)
-                self.flip_axes(obj)
-            else:  # normal model
-                self.write_flipped_matrix(obj.matrix_local, file)
-                self.write_matrix(self.create_blank_matrix(), file)
-
-            file.write(struct.pack('II', 0, 3))
-            if obj.name.strip().startswith("#xref"):  # Rewriting names of Xref Subscene
-                self.write_cstring(self.fake_xref_name(obj.name), file)
-            else:
-                self.write_cstring(obj.name, file)
-
-            # Write custom data
-
-            customdata = self.get_custom_data(obj)
 
-            self.write_cstring(str(customdata).replace('|', '\r\n'), file)
-            if object_type == 'OBJM':
-                file.write(struct.pack('I', objects_id_mesh))
-                self.write_gmesh(obj, file)
-            if object_type == 'OBJX':
-                if obj.name.strip().startswith("#xref"): # Xref Subscene (Unofficial)
-                    self.write_cstring(self.find_xref_path(obj), file) # Write path with 3 character extension
-                else:  # File > link Subscene
-                    apth = os.path.abspath(bpy.path.abspath(obj.data.library.filepath))
-                    self.write_cstring(str(self.get_relative_texpath(apth.replace(".blend", ".ble"))), file)
-            objects_id_current += 1
-
-            self.write_filelen(object_offset, file, -8)
-            self.write_filelen(hier_start_offset, file, -8)
+        # Meshes are extracted in main thread a few objects ahead and encoded in worker threads.
+        # Unchanged meshes of previous export are taken from cache
+        mesh_objects = [entry.obj for entry in exportables if entry.type == 'OBJM']
+        use_cache = self.prefs.incremental_export
+        if not use_cache:
+            GmeshCache.clear()
+        workers = min(8, os.cpu_count() or 1)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        pending = collections.deque() # (Object name, Fingerprint, Encoded GMSH or Future) in export order
+        next_mesh = 0
+        cached = 0
+        def prefetch():
+            nonlocal next_mesh, cached
+            while next_mesh < len(mesh_objects) and len(pending) < workers * 2:
+                ob = mesh_objects[next_mesh]
+                material_ids = self.get_material_id_list(ob)
+                fingerprint = GmeshCache.fingerprint(ob, material_ids) if use_cache else None
+                encoded = GmeshCache.get(ob, fingerprint) if use_cache else None
+                if encoded is None:
+                    encoded = pool.submit(self.encode_gmesh, self.extract_gmesh(ob, material_ids))
+                else:
+                    cached += 1
+                pending.append((ob.name, fingerprint, encoded))
+                next_mesh += 1
+        def next_gmesh():
+            name, fingerprint, encoded = pending.popleft()
+            if isinstance(encoded, concurrent.futures.Future):
+                encoded = encoded.result()
+                if use_cache:
+                    GmeshCache.set(name, fingerprint, encoded)
+            return encoded
 
-        self.write_animations(self, file, exportables, objects_id_dictionary, self.prefs.bake_animation)
-
-
-    def build_and_notify(self):
+        try:
+            for entry in exportables:
+                obj = entry.obj
+                #print('writing object ' + entry.name)
+                object_offset = self.create_header(entry.type, 0, file)
+                file.write(struct.pack('II', entry.parent_id, 0))
+
+                pivot = self.object_has_pivot(obj) if obj is not None else None
+                if obj is None: # Subscene xref at origin
+                    self.write_flipped_matrix(self.create_blank_matrix(), file)
+                    self.write_matrix(self.create_blank_matrix(), file)
+                elif pivot is not None:  # If special pivot constraint used?
+                    # print('using pivot matrix from ' + pivot.target.name + ' for ' + obj.name)
+                    obj_matrix = self.flipped_local_matrix(obj, pivot)
+                    target_matrix = self.flipped_local_matrix(pivot.target)
+                    if obj_matrix is not None and target_matrix is not None:
+                        self.write_matrix(obj_matrix, file)
+                        self.write_matrix(target_matrix, file, obj.location)
+                    else: # Unusual setup, let Blender evaluate flipped objects
+                        self.flip_axes(obj)  # slow
+                        try:
+                            self.write_matrix(obj.matrix_local, file)
+                            self.flip_axes(pivot.target)
+                            try:
+                                self.write_matrix(pivot.target.matrix_local, file, obj.location)
+                            finally:
+                                self.flip_axes(pivot.target)
+                        finally:
+                            self.flip_axes(obj)
+                else:  # normal model
+                    self.write_flipped_matrix(self.object_matrix(entry), file)
+                    self.write_matrix(self.create_blank_matrix(), file)
+
+                file.write(struct.pack('II', 0, 3))
+                self.write_cstring(entry.name, file)
+                self.write_cstring(entry.custom_data, file)
+                if entry.type == 'OBJM':
+                    file.write(struct.pack('I', entry.mesh_id))
+                    prefetch()
+                    self.write_gmesh(obj, file, next_gmesh())
+                if entry.type == 'OBJX':
+                    self.write_cstring(entry.xref_path, file)
+
+                self.write_filelen(object_offset, file, -8)
+                self.write_filelen(hier_start_offset, file, -8)
+        finally:
+            for name, fingerprint, encoded in pending: # Export failed, drop meshes not written yet
+                if isinstance(encoded, concurrent.futures.Future):
+                    encoded.cancel()
+            pool.shutdown()
+        if use_cache:
+            print("Meshes from cache: %d / %d" % (cached, len(mesh_objects)))
+
+        self.write_animations(self, file, exportables, self.prefs.bake_animation)
+
+
+    def build_and_notify(self, export_path=None, subscene=False):
         bgeometry = os.path.join(self.prefs.wf_path, 'tools', 'bgeometry.exe') # os independent path
-        export_path = self.export_path
-        if '/vehicle/' in export_path or '\\vehicle\\' in export_path:
+        if export_path is None:
+            export_path = self.export_path
+        if not subscene and ('/vehicle/' in export_path or '\\vehicle\\' in export_path):
             popen_args = [bgeometry, '-v', '-vhcl', '-input', export_path, '-output', export_path[:-5]+'.vhcl']
         else:
             popen_args = [bgeometry, '-v', '-input', export_path, '-output', export_path[:-5]+'.scne']
@@ -761,8 +1263,20 @@ class WFTB_OP_export_bgo(bpy.types.Operator):
             popen_args = ['wine'] + popen_args
         if os.path.isfile(bgeometry):
             print("Building asset ...")
-            thread = self.prefs.popen_and_call(self.notify, popen_args)
+            # Starts once textures used by the asset are built
+            build_service.max_workers = self.prefs.build_jobs
+            build_service.submit(popen_args[-1], popen_args, self.texture_jobs, self.notify)
+            if not bpy.app.timers.is_registered(redraw_build_status):
+                bpy.app.timers.register(redraw_build_status, first_interval=0.5)
 
-    def notify(self):
-        print("... Building Done")
+    @staticmethod
+    def report_textures(texture_jobs):
+        if texture_jobs.jobs:
+            print(texture_jobs.report())
+
+    @staticmethod
+    def notify(result):
+        print("... Building Done:", result.summary())
+        if result.failed:
+            print(result.output)
 
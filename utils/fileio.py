@@ -0,0 +1,38 @@
+"""File helpers for caches and manifests
+
+Content hashing and json files that are replaced in one step, so a crash
+or a reader in other process never sees a half written manifest. Shared by
+the texture cache of the SCNE importer and the texture build manifest of
+the exporter.
+
+Does not use bpy.
+"""
+
+import os
+import json
+import hashlib
+
+
+def file_hash(filepath):
+    """SHA-1 of file content"""
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def read_json(filepath, default):
+    """Load json file, default if missing or broken"""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def write_json(filepath, text):
+    """Replace file with json text"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmpname = filepath + '.tmp'
+    with open(tmpname, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmpname, filepath)
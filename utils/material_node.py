@@ -1,6 +1,24 @@
 import bpy
 
 
+# Image slots of the wrapper: (Image property, Input socket, Socket type, Default value, Texture node, Linked node, Linked input)
+# Without image the group input is linked, with image a texture node is linked instead
+SLOTS = [
+    ('ao_image', 'AmbientOcclusion', 'NodeSocketFloat', 1.0, 'AO Texture', 'Mix Albedo with AO', 2),
+    ('base_color_image', 'BaseColor', 'NodeSocketColor', [0.8, 0.8, 0.8, 1], 'Base Color Texture', 'Mix Albedo with AO', 1),
+    ('specular_color_image', 'SpecularColor', 'NodeSocketColor', [0.8, 0.8, 0.8, 1], None, None, None),
+    ('specular_level_image', 'SpecularLevel', 'NodeSocketFloat', 0.5, 'Specular Level Texture', 'Principled BSDF', 'Specular'),
+    ('glossiness_image', 'Glossiness', 'NodeSocketFloat', 0, 'Glossiness Texture', 'Principled BSDF', 'Clearcoat'),
+    ('self_illumination_image', 'SelfIllumination', 'NodeSocketColor', [0, 0, 0, 1], 'Self Illumination Texture', 'Principled BSDF', 'Emission'),
+    ('opacity_image', 'Opacity', 'NodeSocketFloat', 1, 'Opacity Texture', 'Principled BSDF', 'Alpha'),
+    ('filter_color_image', 'FilterColor', 'NodeSocketColor', [0, 0, 0, 1], 'Filter Color Texture', 'Invert Filter', 1),
+    ('bump_image', 'Bump', 'NodeSocketColor', [0.5, 0.5, 1, 1], 'Bump Texture', 'Normal Map', 1),
+    ('mrs_image', 'MRS', 'NodeSocketColor', [0, 0.4, 0.5, 1], 'MRS Texture', 'Split MRS', 0),
+    ('refraction_image', 'Refraction', 'NodeSocketFloat', 1.45, 'Refraction Texture', 'Principled BSDF', 'IOR'),
+    ('displacement_image', 'Displacement', 'NodeSocketColor', [0, 0, 0, 1], 'Displacement Texture', 'Vector Displacement', 0),
+]
+
+
 class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
     """Add wreckfest node"""
     bl_name = "wreckfest_wrapper_node"
@@ -8,89 +26,41 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
 
     # Manage the node sockets
     def __nodeinterface_setup__(self):
-        # Clear inputs
-        self.node_tree.inputs.clear()
-
-        # Functions Shortcuts
-        add_input = self.node_tree.inputs.new
-        add_output = self.node_tree.outputs.new
-        g_input = self.inputs.get
-
-        # <editor-fold desc="Inputs Creation">
-
-        # Create inputs if no image was set
-
-        if self.ao_image is None:
-            add_input('NodeSocketFloat', 'AmbientOcclusion')
-            g_input('AmbientOcclusion').default_value = 1.0
-
-        if self.base_color_image is None:
-            add_input('NodeSocketColor', 'BaseColor')
-            g_input('BaseColor').default_value = [0.8, 0.8, 0.8, 1]
-
-        if self.specular_color_image is None:
-            add_input('NodeSocketColor', 'SpecularColor')
-            g_input('SpecularColor').default_value = [0.8, 0.8, 0.8, 1]
-
-        if self.specular_level_image is None:
-            add_input('NodeSocketFloat', 'SpecularLevel')
-            g_input('SpecularLevel').default_value = 0.5
-
-        if self.glossiness_image is None:
-            add_input('NodeSocketFloat', 'Glossiness')
-            g_input('Glossiness').default_value = 0
-
-        if self.self_illumination_image is None:
-            add_input('NodeSocketColor', 'SelfIllumination')
-            g_input('SelfIllumination').default_value = [0, 0, 0, 1]
-
-        if self.opacity_image is None:
-            add_input('NodeSocketFloat', 'Opacity')
-            g_input('Opacity').default_value = 1
-
-        if self.filter_color_image is None:
-            add_input('NodeSocketColor', 'FilterColor')
-            g_input('FilterColor').default_value = [0, 0, 0, 1]
-
-        if self.bump_image is None:
-            add_input('NodeSocketColor', 'Bump')
-            g_input('Bump').default_value = [0.5, 0.5, 1, 1]
-
-        if self.mrs_image is None:
-            add_input('NodeSocketColor', 'MRS')
-            g_input('MRS').default_value = [0, 0.4, 0.5, 1]
-
-        if self.refraction_image is None:
-            add_input('NodeSocketFloat', 'Refraction')
-            g_input('Refraction').default_value = 1.45
-
-        if self.displacement_image is None:
-            add_input('NodeSocketColor', 'Displacement')
-            g_input('Displacement').default_value = [0, 0, 0, 1]
-
-        # </editor-fold>
-
-        # <editor-fold desc="Inputs Creation">
+        # Inputs of slots without image, in slot order
+        wanted = [slot for slot in SLOTS if getattr(self, slot[0]) is None]
+        wanted_names = [slot[1] for slot in wanted]
+        inputs = self.node_tree.inputs
+
+        # Remove inputs of slots that got an image
+        for socket in list(inputs):
+            if socket.name not in wanted_names:
+                inputs.remove(socket)
+
+        # Create inputs of slots that lost their image, keep values of existing inputs
+        for prop, name, socket_type, default, *_ in wanted:
+            if inputs.get(name) is None:
+                socket = inputs.new(socket_type, name)
+                socket.default_value = default
+                if self.inputs.get(name) is not None:
+                    self.inputs[name].default_value = default
+
+        # Keep slot order
+        for index, name in enumerate(wanted_names):
+            current = inputs.find(name)
+            if current != index:
+                inputs.move(current, index)
+
+        # <editor-fold desc="Outputs Creation">
 
         if self.node_tree.outputs.get('Shader Surface') is None:
-            add_output('NodeSocketShader', 'Shader Surface')
+            self.node_tree.outputs.new('NodeSocketShader', 'Shader Surface')
         if self.node_tree.outputs.get('Displacement') is None:
-            add_output('NodeSocketVector', 'Displacement')
+            self.node_tree.outputs.new('NodeSocketVector', 'Displacement')
 
         # </editor-fold>
 
-    def __nodetree_setup__(self):
-
-        # <editor-fold desc="Clear">
-
-        # Clear all the links
-        self.node_tree.links.clear()
-
-        # Clear all the nodes
-        for node in self.node_tree.nodes:
-            if not node.name in ['Group Input', 'Group Output']:
-                self.node_tree.nodes.remove(node)
-        # </editor-fold>
+    def __nodetree_base_setup__(self):
+        '''Nodes and links that don't depend on images'''
 
         # <editor-fold desc="Node Creation">
         input_node = self.node_tree.nodes['Group Input']
@@ -102,6 +72,7 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
 
         # BSDF Shader node
         bsdf = add_node('ShaderNodeBsdfPrincipled')
+        bsdf.name = 'Principled BSDF'
         bsdf.location = (600, 0)
 
         # Split Metallic Roughness Specular node
@@ -122,110 +93,17 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
 
         # Normal Map Node
         normal_map = add_node('ShaderNodeNormalMap')
+        normal_map.name = 'Normal Map'
         normal_map.location = (200, -400)
 
         # Displacement Map
         displacement = add_node('ShaderNodeVectorDisplacement')
+        displacement.name = 'Vector Displacement'
         displacement.location = (600, -600)
         # </editor-fold>
 
         # <editor-fold desc="Links">
 
-        # Create Links
-        g_input = self.inputs.get
-
-        # Links input node or Create Texture Nodes
-        if self.ao_image is None:
-            link(input_node.outputs['AmbientOcclusion'], mix_rgb.inputs[2])
-        else:
-            ao_texture = add_node('ShaderNodeTexImage')
-            ao_texture.name = 'AO Texture'
-            ao_texture.image = self.ao_image
-            link(ao_texture.outputs[0], mix_rgb.inputs[2])
-
-        if self.base_color_image is None:
-            link(input_node.outputs['BaseColor'], mix_rgb.inputs[1])
-        else:
-            base_color_texture = add_node('ShaderNodeTexImage')
-            base_color_texture.name = 'Base Color Texture'
-            base_color_texture.image = self.base_color_image
-            link(base_color_texture.outputs[0], mix_rgb.inputs[1])
-
-        if self.specular_color_image is None:
-            pass
-
-        if self.specular_level_image is None:
-            link(input_node.outputs['SpecularLevel'], bsdf.inputs['Specular'])
-        else:
-            specular_level_texture = add_node('ShaderNodeTexImage')
-            specular_level_texture.name = 'Specular Level Texture'
-            specular_level_texture.image = self.specular_level_image
-            link(specular_level_texture.outputs[0], bsdf.inputs['Specular'])
-
-        if self.glossiness_image is None:
-            link(input_node.outputs['Glossiness'], bsdf.inputs['Clearcoat'])
-        else:
-            glossiness_texture = add_node('ShaderNodeTexImage')
-            glossiness_texture.name = 'Glossiness Texture'
-            glossiness_texture.image = self.glossiness_image
-            link(glossiness_texture.outputs[0], bsdf.inputs['Clearcoat'])
-
-        if self.self_illumination_image is None:
-            link(input_node.outputs['SelfIllumination'], bsdf.inputs['Emission'])
-        else:
-            self_illumination_texture = add_node('ShaderNodeTexImage')
-            self_illumination_texture.name = 'Self Illumination Texture'
-            self_illumination_texture.image = self.self_illumination_image
-            link(self_illumination_texture.outputs[0], bsdf.inputs['Emission'])
-
-        if self.opacity_image is None:
-            link(input_node.outputs['Opacity'], bsdf.inputs['Alpha'])
-        else:
-            opacity_texture = add_node('ShaderNodeTexImage')
-            opacity_texture.name = 'Opacity Texture'
-            opacity_texture.image = self.opacity_image
-            link(opacity_texture.outputs[0], bsdf.inputs['Alpha'])
-
-        if self.filter_color_image is None:
-            link(input_node.outputs['FilterColor'], invert.inputs[1])
-        else:
-            filter_color_texture = add_node('ShaderNodeTexImage')
-            filter_color_texture.name = 'Filter Color Texture'
-            filter_color_texture.image = self.filter_color_image
-            link(filter_color_texture.outputs[0], invert.inputs[1])
-
-        if self.bump_image is None:
-            link(input_node.outputs['Bump'], normal_map.inputs[1])
-        else:
-            bump_texture = add_node('ShaderNodeTexImage')
-            bump_texture.name = 'Bump Texture'
-            bump_texture.image = self.bump_image
-            link(bump_texture.outputs[0], normal_map.inputs[1])
-
-        if self.mrs_image is None:
-            link(input_node.outputs['MRS'], split_mrs.inputs[0])
-        else:
-            mrs_texture = add_node('ShaderNodeTexImage')
-            mrs_texture.name = 'MRS Texture'
-            mrs_texture.image = self.mrs_image
-            link(mrs_texture.outputs[0], split_mrs.inputs[0])
-
-        if self.refraction_image is None:
-            link(input_node.outputs['Refraction'], bsdf.inputs['IOR'])
-        else:
-            refraction_texture = add_node('ShaderNodeTexImage')
-            refraction_texture.name = 'Refraction Texture'
-            refraction_texture.image = self.refraction_image
-            link(refraction_texture.outputs[0], bsdf.inputs['IOR'])
-
-        if self.displacement_image is None:
-            link(input_node.outputs['Displacement'], displacement.inputs[0])
-        else:
-            displacement_texture = add_node('ShaderNodeTexImage')
-            displacement_texture.name = 'Displacement Texture'
-            displacement_texture.image = self.displacement_image
-            link(displacement_texture.outputs[0], displacement.inputs[0])
-
         # -Normal Map
         link(normal_map.outputs[0], bsdf.inputs['Normal'])
         # -Apply AO on Base Color
@@ -241,9 +119,63 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
 
         # </editor-fold>
 
+    def __nodetree_setup__(self):
+        nodes = self.node_tree.nodes
+        if nodes.get('Principled BSDF') is None: # New or old style tree, build fixed nodes
+            for node in list(nodes):
+                if not node.name in ['Group Input', 'Group Output']:
+                    nodes.remove(node)
+            self.__nodetree_base_setup__()
+
+        input_node = nodes['Group Input']
+
+        # Only touch slots where texture node or link differs from image state
+        for prop, name, socket_type, default, texture_name, target_name, target_input in SLOTS:
+            if texture_name is None: # Input without effect
+                continue
+            image = getattr(self, prop)
+            texture = nodes.get(texture_name)
+            if image is None:
+                if texture is not None:
+                    nodes.remove(texture)
+                from_socket = input_node.outputs[name]
+            else:
+                if texture is None:
+                    texture = nodes.new('ShaderNodeTexImage')
+                    texture.name = texture_name
+                if texture.image != image:
+                    texture.image = image
+                from_socket = texture.outputs[0]
+            to_socket = nodes[target_name].inputs[target_input]
+            if not to_socket.is_linked or to_socket.links[0].from_socket != from_socket:
+                self.node_tree.links.new(from_socket, to_socket)
+
+    def slot_signature(self):
+        '''Images of all slots, wrappers with same signature can share inner node tree'''
+        return '|'.join(getattr(self, slot[0]).name if getattr(self, slot[0]) else '' for slot in SLOTS)
+
+    def find_shared_tree(self, signature):
+        for group in bpy.data.node_groups:
+            if group.name.startswith('.' + self.bl_name) and group.get('wftb_slots') == signature:
+                return group
+        return None
+
     def update_images(self, context):
+        signature = self.slot_signature()
+        if self.node_tree.get('wftb_slots') == signature:
+            return
+        shared = self.find_shared_tree(signature)
+        if shared is not None: # Use existing tree with same images
+            old_tree = self.node_tree
+            self.node_tree = shared
+            if old_tree.users == 0:
+                bpy.data.node_groups.remove(old_tree)
+            return
+        if self.node_tree.users > 1: # Copy on write, other wrappers keep their tree
+            self.node_tree = self.node_tree.copy()
         self.__nodeinterface_setup__()
         self.__nodetree_setup__()
+        self.node_tree['wftb_slots'] = signature
 
     # <editor-fold desc="Image Properties">
 
@@ -356,9 +288,13 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
     # </editor-fold>
 
     def init(self, context):
-        custom_node_name = "Wreckfes Wrapper"
-        self.node_tree = bpy.data.node_groups.new('.' + self.bl_name, 'ShaderNodeTree')
         self.label = self.bl_label
+        self.width = 500
+        signature = self.slot_signature()
+        self.node_tree = self.find_shared_tree(signature) # Wrappers without images share one tree
+        if self.node_tree is not None:
+            return
+        self.node_tree = bpy.data.node_groups.new('.' + self.bl_name, 'ShaderNodeTree')
         # Inputs
         # Add a node  group input to the group
         input_node = self.node_tree.nodes.new('NodeGroupInput')
@@ -368,7 +304,7 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
         output_node.location = (1000, 0)
         self.__nodeinterface_setup__()
         self.__nodetree_setup__()
-        self.width = 500
+        self.node_tree['wftb_slots'] = signature
 
     def draw_buttons(self, context, layout):
         row = layout.row()
@@ -407,10 +343,11 @@ class WreckfestWrapperNode(bpy.types.ShaderNodeCustomGroup):
         row.prop(self, "displacement_image", text="")
 
     def copy(self, node):
-        self.node_tree = node.node_tree.copy()
+        self.node_tree = node.node_tree # Shared until images change
 
     def free(self):
-        bpy.data.node_groups.remove(self.node_tree, do_unlink=True)
+        if self.node_tree is not None and self.node_tree.users <= 1: # Last wrapper using the tree
+            bpy.data.node_groups.remove(self.node_tree, do_unlink=True)
 
 
 
@@ -0,0 +1,125 @@
+"""Round trip test of BGO3 reader
+
+Meshes are encoded with the exporter's GMSH encoder and written with its
+chunk helpers from bgo_writer, then read back with bgo_reader.
+
+Runs without Blender, but only as a standalone module: pytest from the
+repository root imports the add-on package, which needs bpy. Run it from
+the utils folder instead:
+    python -m unittest test_bgo_reader
+"""
+
+import os
+import sys
+import struct
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bgo_reader
+import bgo_writer
+from bgo_writer import BgoWriter
+
+
+def quad_arrays(tangents=True):
+    """Mesh arrays like get_gmesh_arrays returns for a 1x1 quad facing +Z, split in 2 triangles"""
+    co = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float32)
+    return {
+        'tri_loops': np.array([0, 1, 2, 0, 2, 3], dtype=np.int32),
+        'tri_materials': np.array([0, 1], dtype=np.int32),
+        'loop_verts': np.arange(4, dtype=np.int32),
+        'co': co,
+        'normals': np.tile(np.float32((0, 0, 1)), (4, 1)),
+        'uvs': [co[:, :2].copy()],
+        'tangents': [(np.tile(np.float32((1, 0, 0)), (4, 1)), np.ones(4, dtype=np.float32))] if tangents else None,
+        'loop_normals': np.tile(np.float32((0, 0, 1)), (4, 1)) if tangents else None,
+        'material_ids': np.array([2, 5], dtype=np.float32),
+    }
+
+def write_bgo(meshes):
+    """BGO3 file with one OBJM for each (name, mesh arrays), in exporter chunk layout"""
+    file = BgoWriter()
+    file.write(struct.pack('I', 0)) # File length
+    file.write(bytes('MAIN', 'utf-8'))
+    bgo_writer.write_info(file, 'tester')
+    mlst_start_offset = bgo_writer.create_header('MLST', 0, file)
+    file.write(struct.pack('I', 0))
+    bgo_writer.write_filelen(mlst_start_offset, file)
+    hier_start_offset = bgo_writer.create_header('HIER', 0, file)
+    file.write(struct.pack('I', len(meshes)))
+    for mesh_id, (name, arrays) in enumerate(meshes):
+        object_offset = bgo_writer.create_header('OBJM', 0, file)
+        file.write(struct.pack('II', 0, 0))
+        file.write(np.eye(4, dtype=np.float32).tobytes() * 2)
+        file.write(struct.pack('II', 0, 3))
+        bgo_writer.write_cstring(name, file)
+        bgo_writer.write_cstring('', file)
+        file.write(struct.pack('I', mesh_id))
+        bgo_writer.write_gmesh(file, bgo_writer.encode_gmesh(arrays))
+        bgo_writer.write_filelen(object_offset, file, -8)
+    bgo_writer.write_filelen(hier_start_offset, file, -8)
+    bgo_writer.write_filelen(0, file)
+    return file
+
+
+class TestBgoReader(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def save(self, name, meshes):
+        filepath = os.path.join(self.folder.name, name)
+        write_bgo(meshes).save(filepath)
+        return filepath
+
+    def test_mesh_values(self):
+        bgo = bgo_reader.read(self.save('quad.bgo3', [('quad', quad_arrays())]))
+        self.assertEqual(bgo['info'], {'version': 777, 'format': 'BGO', 'username': 'tester'})
+        mesh = bgo['objects'][0]['mesh']
+        self.assertEqual((mesh['triangles'], mesh['uv_layers']), (2, 1))
+        v = mesh['vertices']
+        corners = [2, 1, 0, 3, 2, 0] # Reversed winding
+        co = quad_arrays()['co'][corners]
+        np.testing.assert_array_equal(v[:, 0], [2, 2, 2, 5, 5, 5]) # Scene material ids
+        np.testing.assert_array_equal(v[:, 1:4], co[:, [0, 2, 1]]) # Y and Z swapped
+        np.testing.assert_array_equal(v[:, 4], co[:, 0])
+        np.testing.assert_array_equal(v[:, 5], 1 - co[:, 1]) # V flipped
+        np.testing.assert_array_equal(v[:, 6:9], np.tile((0, 1, 0), (6, 1))) # Normal
+        np.testing.assert_array_equal(v[:, 9:12], np.tile((1, 0, 0), (6, 1))) # MikkTSpace tangent
+        np.testing.assert_array_equal(v[:, 12:15], np.tile((0, 0, 1), (6, 1))) # Binormal from sign
+
+    def test_approximated_tangents(self):
+        bgo = bgo_reader.read(self.save('quad.bgo3', [('quad', quad_arrays(tangents=False))]))
+        v = bgo['objects'][0]['mesh']['vertices']
+        np.testing.assert_array_equal(v[:, 6:9], np.tile((0, 1, 0), (6, 1)))
+        np.testing.assert_array_equal(v[:, 9:12], np.tile((-1, 0, 0), (6, 1))) # normal x Y
+        np.testing.assert_array_equal(v[:, 12:15], np.tile((0, 0, -1), (6, 1)))
+
+    def test_round_trip(self):
+        a = self.save('a.bgo3', [('quad', quad_arrays()), ('flat', quad_arrays(tangents=False))])
+        b = self.save('b.bgo3', [('quad', quad_arrays()), ('flat', quad_arrays(tangents=False))])
+        self.assertEqual(bgo_reader.diff(bgo_reader.read(a), bgo_reader.read(b)), [])
+        self.assertEqual(bgo_reader.diff_files(a, b), [])
+
+    def test_diff(self):
+        moved = quad_arrays()
+        moved['co'][1, 2] += 0.25
+        a = self.save('a.bgo3', [('quad', quad_arrays())])
+        b = self.save('b.bgo3', [('quad', moved), ('new', quad_arrays())])
+        lines = bgo_reader.diff_files(a, b)
+        self.assertIn('  + object new', lines)
+        self.assertIn('  ~ object quad: mesh data (max 0.25 in columns [2])', lines) # Blender Z is column 2
+        self.assertNotIn('  ~ object quad', ' '.join(bgo_reader.diff_files(a, b, tolerance=0.5)))
+
+    def test_truncated(self):
+        with open(self.save('quad.bgo3', [('quad', quad_arrays())]), 'rb') as f:
+            data = f.read()
+        with self.assertRaises(bgo_reader.BgoReadError):
+            bgo_reader.parse(data[:-10])
+
+
+if __name__ == '__main__':
+    unittest.main()